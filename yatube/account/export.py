@@ -0,0 +1,182 @@
+"""
+Export of user data: profile, posts, comments, likes and follows.
+
+Records are read by iterator(chunk_size=EXPORT_CHUNK_SIZE) and written
+as soon as they are read, so memory use doesn't depend on size of
+account. Data is NDJSON (one record with "type" per line) or CSV with
+CSV_FIELDS columns. With media, data and uploaded images are bundled in
+zip archive, which is produced chunk by chunk as well.
+"""
+import csv
+import json
+import zipfile
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Post
+
+EXPORT_CHUNK_SIZE = 2000
+BLOCK_SIZE = 64 * 1024
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+CSV_FIELDS = (
+    'type', 'id', 'created', 'text', 'post', 'group', 'author', 'image',
+    'likes', 'comments',
+)
+
+
+def iter_records(user):
+    """Dicts of everything user has made."""
+    profile = user.profile
+    yield {
+        'type': 'user',
+        'id': user.id,
+        'created': user.date_joined,
+        'author': user.username,
+        'first_name': user.first_name,
+        'last_name': user.last_name,
+        'email': user.email,
+        'bio': profile.bio,
+        'location': profile.location,
+        'birth_date': profile.birth_date,
+        'image': profile.photo.name,
+    }
+    posts = Post.objects.filter(author_id=user.id).order_by('id').values(
+        'id', 'created', 'text', 'group__slug', 'image', 'likes',
+        'comment_count',
+    )
+    for post in posts.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'type': 'post',
+            'id': post['id'],
+            'created': post['created'],
+            'text': post['text'],
+            'group': post['group__slug'],
+            'image': post['image'],
+            'likes': post['likes'],
+            'comments': post['comment_count'],
+        }
+    comments = Comment.objects.filter(author_id=user.id).order_by(
+        'id').values('id', 'created', 'text', 'post_id')
+    for comment in comments.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'type': 'comment',
+            'id': comment['id'],
+            'created': comment['created'],
+            'text': comment['text'],
+            'post': comment['post_id'],
+        }
+    likes = Post.user_likes.through.objects.filter(
+        user_id=user.id).order_by('id').values_list('post_id', flat=True)
+    for post_id in likes.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {'type': 'like', 'post': post_id}
+    follows = Follow.objects.filter(user_id=user.id).order_by('id').values(
+        'id', 'author__username')
+    for follow in follows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield {
+            'type': 'follow',
+            'id': follow['id'],
+            'author': follow['author__username'],
+        }
+
+
+class Echo:
+    """File-like object returning what is written, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def iter_ndjson(records):
+    for record in records:
+        yield json.dumps(
+            record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def iter_csv(records):
+    writer = csv.DictWriter(Echo(), CSV_FIELDS, extrasaction='ignore')
+    yield writer.writeheader()
+    for record in records:
+        yield writer.writerow(record)
+
+
+def iter_data(user, data_format):
+    """Lines of user data in format of FORMATS."""
+    records = iter_records(user)
+    if data_format == 'csv':
+        return iter_csv(records)
+    return iter_ndjson(records)
+
+
+class ZipStream:
+    """Unseekable file keeping what zipfile writes until it is drained."""
+    def __init__(self):
+        self.buffer = []
+        self.position = 0
+
+    def write(self, data):
+        self.buffer.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Data written since the last drain, if any."""
+        if self.buffer:
+            data = b''.join(self.buffer)
+            self.buffer = []
+            yield data
+
+
+def get_media_names(user):
+    """Names of files uploaded by user, read by chunks."""
+    photo = user.profile.photo.name
+    if photo:
+        yield photo
+    images = Post.objects.filter(author_id=user.id).exclude(
+        image='').order_by('id').values_list('image', flat=True)
+    yield from images.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_zip(user, data_format):
+    """
+    Zip archive with data file and media/ folder, in chunks.
+    Entries are written with data descriptors, so nothing is seeked and
+    only the current block is kept in memory.
+    """
+    stream = ZipStream()
+    date_time = timezone.localtime().timetuple()[:6]
+    with zipfile.ZipFile(stream, 'w') as archive:
+        info = zipfile.ZipInfo(f'data.{data_format}', date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with archive.open(info, 'w', force_zip64=True) as entry:
+            for line in iter_data(user, data_format):
+                entry.write(line.encode())
+                yield from stream.drain()
+        for name in get_media_names(user):
+            try:
+                file = default_storage.open(name, 'rb')
+            except OSError:
+                continue
+            # Images are compressed already.
+            info = zipfile.ZipInfo(f'media/{name}', date_time)
+            with file, archive.open(info, 'w', force_zip64=True) as entry:
+                for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+                    entry.write(block)
+                    yield from stream.drain()
+    yield from stream.drain()
+
+
+def export(user, data_format='ndjson', media=False):
+    """Chunks of export, str of data or bytes of zip with media."""
+    if media:
+        return iter_zip(user, data_format)
+    return iter_data(user, data_format)
@@ -0,0 +1,13 @@
+from django import forms
+
+from core.images import IngestImagesMixin
+from .models import Profile
+
+
+class ProfileForm(IngestImagesMixin, forms.ModelForm):
+    """Form for update account information."""
+    ingest_fields = ('photo',)
+
+    class Meta:
+        model = Profile
+        fields = ('photo', 'bio', 'location', 'birth_date')
@@ -0,0 +1,44 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from account.export import FORMATS, export
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Export posts, comments, likes and follows of user as NDJSON or '
+        'CSV, with --media as zip archive with uploaded images.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--format', choices=FORMATS, default='ndjson',
+            help='Format of data.',
+        )
+        parser.add_argument(
+            '--media', action='store_true',
+            help='Bundle data and images in zip archive.',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write to, data is written to stdout by default.',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options['username']).first()
+        if user is None:
+            raise CommandError(f'User {options["username"]} not found')
+        if options['media'] and not options['output']:
+            raise CommandError('Zip archive is written only to --output')
+        chunks = export(user, options['format'], options['media'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'wb') as file:
+            for chunk in chunks:
+                file.write(chunk if options['media'] else chunk.encode())
+        self.stdout.write(f'Exported to {options["output"]}')
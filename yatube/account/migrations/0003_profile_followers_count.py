@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:02
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_followers(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    Profile = apps.get_model('account', 'Profile')
+    counts = Follow.objects.values('author_id').annotate(total=Count('id'))
+    for row in counts.iterator():
+        Profile.objects.filter(user_id=row['author_id']).update(
+            followers_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_auto_20230215_0108'),
+        ('posts', '0013_auto_20230402_1319'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков'),
+        ),
+        migrations.RunPython(count_followers, migrations.RunPython.noop),
+    ]
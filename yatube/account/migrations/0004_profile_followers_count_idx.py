@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0003_profile_followers_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['followers_count'], name='profile_followers_count_idx'),
+        ),
+    ]
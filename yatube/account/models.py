@@ -3,6 +3,9 @@ from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
+from core.jobs import task
+from core.thumbnails import schedule_thumbnails
+
 User = get_user_model()
 
 
@@ -34,6 +37,19 @@ class Profile(models.Model):
         upload_to='account/',
         blank=True,
     )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+
+    class Meta:
+        indexes = [
+            # Authors with too many followers for fan-out of feed.
+            models.Index(
+                fields=['followers_count'],
+                name='profile_followers_count_idx'
+            ),
+        ]
 
 
 @receiver(post_save, sender=User)
@@ -42,6 +58,23 @@ def create_user_profile(sender, instance, created, **kwargs):
         Profile.objects.create(user=instance)
 
 
+@task()
+def save_profile(user_id):
+    """Save profile, so its receivers see changes of user."""
+    profile = Profile.objects.filter(user_id=user_id).first()
+    if profile is not None:
+        profile.save()
+
+
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
+def save_user_profile(sender, instance, created, update_fields=None,
+                      **kwargs):
+    if created or update_fields == frozenset({'last_login'}):
+        return
+    save_profile.delay(instance.id)
+
+
+@receiver(post_save, sender=Profile)
+def make_photo_thumbnails(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_thumbnails(instance, 'photo')
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+IMAGE = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestExport(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='exported')
+        cls.other = User.objects.create_user(username='other')
+        group = Group.objects.create(title='Group', slug='exported-group')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=group,
+            text='Exported post',
+            image=SimpleUploadedFile('small.gif', IMAGE, 'image/gif'),
+        )
+        for number in range(5):
+            Post.objects.create(author=cls.user, text=f'Post {number}')
+        other_post = Post.objects.create(author=cls.other, text='Not mine')
+        Comment.objects.create(
+            author=cls.user, post=other_post, text='My comment')
+        Comment.objects.create(
+            author=cls.other, post=cls.post, text='Not my comment')
+        Post.add_like(other_post.id, cls.user.id)
+        Follow.objects.create(user=cls.user, author=cls.other)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def get_export(self, **params):
+        response = self.client.get(reverse('account:export'), params)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_ndjson(self):
+        """Every record of user is a line, records of others are not."""
+        response, content = self.get_export()
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = [json.loads(line) for line in content.splitlines()]
+        types = [record['type'] for record in records]
+        self.assertEqual(
+            types, ['user'] + ['post'] * 6 + ['comment', 'like', 'follow'])
+        self.assertEqual(records[1]['group'], 'exported-group')
+        self.assertEqual(records[7]['text'], 'My comment')
+        self.assertEqual(records[9]['author'], 'other')
+
+    def test_csv(self):
+        _, content = self.get_export(format='csv')
+        rows = list(csv.DictReader(io.StringIO(content.decode())))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(rows[1]['text'], 'Exported post')
+        response = self.client.get(reverse('account:export'), {'format': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_zip_with_media(self):
+        response, content = self.get_export(media=1)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            self.assertEqual(archive.testzip(), None)
+            self.assertEqual(
+                archive.read(f'media/{self.post.image.name}'), IMAGE)
+            lines = archive.read('data.ndjson').splitlines()
+        self.assertEqual(len(lines), 10)
+
+    def test_guest_redirected(self):
+        response = Client().get(reverse('account:export'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_command(self):
+        output = os.path.join(TEMP_MEDIA_ROOT, 'export.zip')
+        call_command(
+            'export_account', 'exported', '--format', 'csv', '--media',
+            '--output', output, stdout=io.StringIO(),
+        )
+        with zipfile.ZipFile(output) as archive:
+            self.assertIn('data.csv', archive.namelist())
+        stdout = io.StringIO()
+        call_command('export_account', 'exported', stdout=stdout)
+        self.assertEqual(len(stdout.getvalue().splitlines()), 10)
@@ -0,0 +1,75 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetTestMixin
+from posts.models import Follow
+
+User = get_user_model()
+FOLLOWERS = 120
+
+
+class TestFollowPages(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='popular')
+        cls.followers = [
+            User.objects.create_user(username=f'follower{number}')
+            for number in range(FOLLOWERS)
+        ]
+        Follow.objects.bulk_create(
+            Follow(user=follower, author=cls.user)
+            for follower in cls.followers
+        )
+        # Every third follower is followed back.
+        for follower in cls.followers[::3]:
+            Follow.objects.create(user=cls.user, author=follower)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_followers_page(self):
+        """Followers are paginated, the newest first, with follow back."""
+        response = self.assertQueryBudget(reverse('account:followers'))
+        followers = response.context['followers']
+        self.assertEqual(len(followers), settings.FOLLOWS_LIMIT_ON_PAGE)
+        self.assertEqual(followers[0].user, self.followers[-1])
+        self.assertEqual(
+            response.context['followed_back'],
+            {follower.id for follower in self.followers[::3]},
+        )
+        self.assertContains(
+            response,
+            reverse('posts:profile_unfollow', args=[self.followers[-3]]),
+        )
+        self.assertContains(
+            response,
+            reverse('posts:profile_follow', args=[self.followers[-1]]),
+        )
+
+    def test_followers_next_pages(self):
+        """All followers are shown once through the pages."""
+        url = reverse('account:followers')
+        seen = []
+        query = ''
+        while query is not None:
+            response = self.assertQueryBudget(f'{url}?{query}')
+            page = response.context['page_obj']
+            seen.extend(follow.user_id for follow in page)
+            query = page.next_query
+        self.assertEqual(
+            sorted(seen), sorted(follower.id for follower in self.followers))
+
+    def test_follows_page(self):
+        """Followed authors are paginated and linked to their profiles."""
+        response = self.assertQueryBudget(reverse('account:follows'))
+        authors = response.context['authors']
+        self.assertEqual(len(authors), FOLLOWERS // 3)
+        for follow in authors:
+            self.assertContains(
+                response, reverse('posts:profile', args=[follow.author]))
@@ -27,4 +27,9 @@ urlpatterns = [
         login_required(views.UserFollowers.as_view()),
         name='followers'
     ),
+    path(
+        'export/',
+        login_required(views.AccountExportView.as_view()),
+        name='export'
+    ),
 ]
@@ -1,11 +1,17 @@
+from django.conf import settings
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 from django.urls import reverse_lazy
-from django.views.generic import TemplateView, UpdateView
+from django.views.generic import ListView, TemplateView, UpdateView, View
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
 
-from posts.models import Follow
+from core.views import CursorPaginationMixin
+from posts.models import get_followees, get_followers_count
+from account.export import FORMATS, export
+from account.forms import ProfileForm
 from account.models import Profile
 
+FOLLOWS_LIMIT = settings.FOLLOWS_LIMIT_ON_PAGE
 User = get_user_model()
 
 
@@ -27,7 +33,7 @@ class UserChangeDataView(UpdateView):
 class AccountChangeDataView(UpdateView):
     """Page for update account information."""
     model = Profile
-    fields = ('photo', 'bio', 'location', 'birth_date')
+    form_class = ProfileForm
     success_url = reverse_lazy('account:index')
     template_name = 'account/update_user.html'
 
@@ -35,30 +41,70 @@ class AccountChangeDataView(UpdateView):
         return get_object_or_404(self.model, pk=self.request.user.profile.pk)
 
 
-class UserFollows(TemplateView):
-    """Show user what follows on you."""
-    template_name = 'account/follows.html'
+class FollowsPageMixin(CursorPaginationMixin):
+    """Cursor pages of follows, the newest first."""
+    paginate_by = FOLLOWS_LIMIT
+    cursor_ordering = ('-id',)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        context['authors'] = user.follower.all()
+        # Rows are numbered through all pages.
+        context['offset'] = (context['page_obj'].number - 1) * FOLLOWS_LIMIT
         return context
 
 
-class UserFollowers(TemplateView):
-    """Show your followers."""
+class UserFollows(FollowsPageMixin, ListView):
+    """Show user what follows on you."""
+    template_name = 'account/follows.html'
+    context_object_name = 'authors'
+    query_budget = 5
+
+    def get_queryset(self):
+        return self.request.user.follower.select_related('author')
+
+    def get_object_count(self):
+        return len(get_followees(self.request.user))
+
+
+class UserFollowers(FollowsPageMixin, ListView):
+    """
+    Show your followers.
+    Which of them are followed back is checked by cached followees.
+    """
     template_name = 'account/followers.html'
+    context_object_name = 'followers'
+    query_budget = 7
+
+    def get_queryset(self):
+        return self.request.user.following.select_related('user')
+
+    def get_object_count(self):
+        return get_followers_count(self.request.user.id)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
-        context['followers'] = user.following.all()
-        related_follows = {}
-        for follower in context['followers']:
-            related_follows[follower] = Follow.objects.filter(
-                user=user,
-                author=follower.user,
-            ).exists()
-        context['related_follows'] = related_follows
+        context['followed_back'] = get_followees(self.request.user)
         return context
+
+
+class AccountExportView(View):
+    """
+    Download all data of user as NDJSON or CSV (?format=csv),
+    with ?media=1 as zip archive with uploaded images.
+    Export is streamed while it is read from database.
+    """
+    def get(self, request, *args, **kwargs):
+        data_format = request.GET.get('format', 'ndjson')
+        if data_format not in FORMATS:
+            return HttpResponseBadRequest('Unknown format of export.')
+        media = bool(request.GET.get('media'))
+        user = request.user
+        if media:
+            content_type, extension = 'application/zip', 'zip'
+        else:
+            content_type, extension = FORMATS[data_format], data_format
+        response = StreamingHttpResponse(
+            export(user, data_format, media), content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="yatube-{user.username}.{extension}"')
+        return response
@@ -0,0 +1,138 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetTestMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TestSearchAPI(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        for i in range(15):
+            Post.objects.create(author=cls.user, text='кот ' * (i + 1))
+        Post.objects.create(author=cls.user, text='собака')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_cursor_pages(self):
+        """Results are ranked and split to pages by cursor links."""
+        response = self.client.get(reverse('api:search'), {'q': 'коты'})
+        data = response.json()
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+        ranks = [post['rank'] for post in data['results']]
+        self.assertEqual(ranks, sorted(ranks))
+        self.assertEqual(data['results'][0]['author'], 'test_user')
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), 5)
+        self.assertIsNone(data['next'])
+        self.assertIsNotNone(data['previous'])
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('api:search'))
+        self.assertEqual(response.json()['results'], [])
+
+
+class TestPostsAPI(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(title='API', slug='api-group')
+        for number in range(12):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'API post {number}',
+            )
+        for number in range(3):
+            Comment.objects.create(
+                author=cls.reader, post=cls.post, text=f'Comment {number}')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.urls = (
+            reverse('api:index'),
+            reverse('api:group', args=[cls.group.slug]),
+            reverse('api:profile', args=[cls.author.username]),
+            reverse('api:follow'),
+            reverse('api:post', args=[cls.post.id]),
+            reverse('api:comments', args=[cls.post.id]),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_lists_paginated(self):
+        """Lists are split by cursor links and counted by counters."""
+        for url, count in (
+            (reverse('api:index'), 12),
+            (reverse('api:group', args=[self.group.slug]), 6),
+            (reverse('api:profile', args=[self.author.username]), 12),
+            (reverse('api:follow'), 12),
+        ):
+            with self.subTest(url=url):
+                data = self.client.get(url).json()
+                self.assertEqual(data['count'], count)
+                self.assertEqual(data['results'][0]['id'], self.post.id)
+                if count > 10:
+                    data = self.client.get(data['next']).json()
+                    self.assertEqual(len(data['results']), count - 10)
+                    self.assertIsNone(data['next'])
+
+    def test_fields_selected(self):
+        url = reverse('api:index')
+        data = self.client.get(url, {'fields': 'id,author'}).json()
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.post.id, 'author': self.author.username},
+        )
+        response = self.client.get(url, {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_post_and_comments(self):
+        data = self.client.get(reverse('api:post', args=[self.post.id]))
+        self.assertEqual(data.json()['comments'], 3)
+        self.assertEqual(data.json()['group'], self.group.slug)
+        data = self.client.get(
+            reverse('api:comments', args=[self.post.id])).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Comment 0', 'Comment 1', 'Comment 2'],
+        )
+        response = self.client.get(reverse('api:post', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    def test_not_modified(self):
+        """Unchanged response gets 304 until post is commented."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+        url = reverse('api:comments', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            author=self.reader, post=self.post, text='New comment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 4)
+
+    def test_guest_feed_unauthorized(self):
+        response = Client().get(reverse('api:follow'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_query_budgets(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url)
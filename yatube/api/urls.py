@@ -0,0 +1,27 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/posts/', views.IndexView.as_view(), name='index'),
+    path('v1/posts/<int:post_id>/', views.PostView.as_view(), name='post'),
+    path(
+        'v1/posts/<int:post_id>/comments/',
+        views.CommentsView.as_view(),
+        name='comments',
+    ),
+    path(
+        'v1/groups/<slug:slug>/posts/',
+        views.GroupView.as_view(),
+        name='group',
+    ),
+    path(
+        'v1/users/<str:username>/posts/',
+        views.ProfileView.as_view(),
+        name='profile',
+    ),
+    path('v1/follow/posts/', views.FollowView.as_view(), name='follow'),
+    path('v1/search/', views.SearchView.as_view(), name='search'),
+]
@@ -0,0 +1,268 @@
+"""
+Read-only JSON API.
+
+Lists are split to pages by cursor urls in "next" and "previous".
+Objects are serialized from values() rows, only fields picked by
+?fields=id,text,author are selected. Responses have ETag, so repeated
+requests with If-None-Match get 304 before anything is built.
+"""
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.utils.functional import cached_property
+from django.views.generic import View
+
+from core.cache import get_generations
+from core.paginator import CursorPaginator
+from core.views import ConditionalGetMixin
+from posts.models import (Comment, Post, get_author_posts_count,
+                          get_feed_posts_count, get_followees,
+                          get_group_posts_count, get_posts_count)
+from posts.utils import (FeedPaginator, get_group_object, get_user_object,
+                         search_posts)
+
+POST_LIMIT = settings.POST_LIMIT_ON_PAGE
+# Field of response by lookup of values().
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'likes': 'likes',
+    'comments': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'post': 'post_id',
+}
+
+
+class InvalidFields(Exception):
+    """Unknown fields are asked by ?fields."""
+
+
+class ApiView(ConditionalGetMixin, View):
+    """
+    Base view of API, errors are answered by JSON too.
+    Responses without validator have get_etag_parts() returning None.
+    """
+    fields = POST_FIELDS
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+        except InvalidFields as error:
+            return JsonResponse(
+                {'detail': f'Unknown fields: {error}.'}, status=400)
+
+    def get_etag_parts(self):
+        return None
+
+    @cached_property
+    def selected_fields(self):
+        """Names of fields asked by ?fields, all fields by default."""
+        names = [
+            name.strip()
+            for name in self.request.GET.get('fields', '').split(',')
+            if name.strip()
+        ]
+        if not names:
+            return list(self.fields)
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidFields(', '.join(unknown))
+        return names
+
+    def get_lookups(self, *extra):
+        lookups = [self.fields[name] for name in self.selected_fields]
+        return lookups + [
+            lookup for lookup in extra if lookup not in lookups]
+
+    def serialize(self, row):
+        data = {name: row[self.fields[name]] for name in self.selected_fields}
+        if 'image' in data:
+            data['image'] = self.request.build_absolute_uri(
+                settings.MEDIA_URL + data['image']) if data['image'] else None
+        return data
+
+
+class ApiListView(ApiView):
+    """
+    Page of objects of get_queryset(), all objects of model by default,
+    the newest first.
+    """
+    model = Post
+    paginate_by = POST_LIMIT
+    paginator_class = CursorPaginator
+    ordering = ('-created', '-id')
+
+    def get_queryset(self):
+        return self.model._default_manager.all()
+
+    def get_object_count(self):
+        """Number of objects from counter, None if it is not known."""
+        return None
+
+    def get_paginator(self, queryset, **kwargs):
+        return self.paginator_class(
+            queryset,
+            self.paginate_by,
+            ordering=self.ordering,
+            count=self.get_object_count,
+            **kwargs,
+        )
+
+    def get(self, request, *args, **kwargs):
+        fields = [field.lstrip('-') for field in self.ordering]
+        paginator = self.get_paginator(
+            self.get_queryset().values(*self.get_lookups(*fields)))
+        page = paginator.get_page(request.GET)
+        return JsonResponse({
+            'count': paginator.count,
+            'results': [self.serialize(row) for row in page],
+            'next': self.get_page_url(page.next_query),
+            'previous': self.get_page_url(page.previous_query),
+        })
+
+    def get_page_url(self, query):
+        if query is None:
+            return None
+        return self.request.build_absolute_uri(f'{self.request.path}?{query}')
+
+
+class IndexView(ApiListView):
+    """All posts."""
+    query_budget = 6
+
+    def get_etag_parts(self):
+        return get_generations('posts')
+
+    def get_object_count(self):
+        return get_posts_count()
+
+
+class GroupView(ApiListView):
+    """Posts of group."""
+    query_budget = 7
+
+    @cached_property
+    def group(self):
+        return get_group_object(self.kwargs.get('slug'))
+
+    def get_etag_parts(self):
+        return get_generations('profiles', f'group:{self.group.id}')
+
+    def get_queryset(self):
+        return Post.objects.filter(group_id=self.group.id)
+
+    def get_object_count(self):
+        return get_group_posts_count(self.group.id)
+
+
+class ProfileView(ApiListView):
+    """Posts of author."""
+    query_budget = 7
+
+    @cached_property
+    def author(self):
+        return get_user_object(self.kwargs.get('username'))
+
+    def get_etag_parts(self):
+        return get_generations('profiles', f'author:{self.author.id}')
+
+    def get_queryset(self):
+        return Post.objects.filter(author_id=self.author.id)
+
+    def get_object_count(self):
+        return get_author_posts_count(self.author.id)
+
+
+class FollowView(ApiListView):
+    """
+    Posts of authors followed by user.
+    Any new post or change of followees gives new ETag.
+    """
+    query_budget = 8
+    paginator_class = FeedPaginator
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Authentication required.'}, status=401)
+        return super().get(request, *args, **kwargs)
+
+    def get_etag_parts(self):
+        if not self.request.user.is_authenticated:
+            return None
+        followees = sorted(get_followees(self.request.user))
+        return (*get_generations('posts'), *followees)
+
+    def get_paginator(self, queryset, **kwargs):
+        return super().get_paginator(
+            queryset, user=self.request.user, **kwargs)
+
+    def get_object_count(self):
+        return get_feed_posts_count(self.request.user)
+
+
+class SearchView(ApiListView):
+    """Posts found by full-text search, the best matches first."""
+    fields = {**POST_FIELDS, 'rank': 'rank'}
+    ordering = ('rank', 'id')
+
+    def get_queryset(self):
+        return search_posts(self.request.GET.get('q'))
+
+
+class PostView(ApiView):
+    """Post by id."""
+    query_budget = 3
+
+    @cached_property
+    def post(self):
+        post = Post.objects.filter(pk=self.kwargs.get('post_id')).values(
+            *self.get_lookups('version', 'author_id')).first()
+        if post is None:
+            raise Http404
+        return post
+
+    def get_etag_parts(self):
+        return (
+            self.post['version'],
+            *get_generations('profiles', f'author:{self.post["author_id"]}'),
+        )
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(self.serialize(self.post))
+
+
+class CommentsView(ApiListView):
+    """Comments of post, the oldest first."""
+    query_budget = 6
+    model = Comment
+    fields = COMMENT_FIELDS
+    ordering = ('created', 'id')
+
+    @cached_property
+    def post(self):
+        post = Post.objects.filter(pk=self.kwargs.get('post_id')).values(
+            'id', 'version', 'comment_count').first()
+        if post is None:
+            raise Http404
+        return post
+
+    def get_etag_parts(self):
+        # Version of post is changed by every comment.
+        return (self.post['version'], *get_generations('profiles'))
+
+    def get_queryset(self):
+        return Comment.objects.filter(post_id=self.post['id'])
+
+    def get_object_count(self):
+        return self.post['comment_count']
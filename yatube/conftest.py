@@ -0,0 +1,17 @@
+import pytest
+from django.conf import settings
+from django.test.utils import override_settings
+
+
+@pytest.fixture(autouse=True, scope='session')
+def test_cache(tmp_path_factory):
+    """
+    Keep cache of test run in temporary directory, tests clear cache and
+    must not wipe cache of the running site.
+    """
+    location = tmp_path_factory.mktemp('cache') / 'cache.sqlite3'
+    caches = {
+        'default': {**settings.CACHES['default'], 'LOCATION': str(location)},
+    }
+    with override_settings(CACHES=caches):
+        yield
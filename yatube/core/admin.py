@@ -0,0 +1,14 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Background jobs and their errors."""
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_at', 'finished')
+    list_filter = ('status', 'name')
+    search_fields = ('key',)
+    readonly_fields = ('token', 'locked_until', 'last_error')
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,107 @@
+"""
+Generation counters and page cache invalidated by them.
+
+Every cached page depends on a few named generations. Writes bump the
+generations they touch, so pages built before the write get new cache
+keys and are never served again.
+"""
+import time
+
+from django.core.cache import cache
+from django.utils.cache import cc_delim_re, patch_vary_headers
+from django.utils.http import urlencode
+
+GENERATION_KEY = 'generation:{}'
+PAGE_KEY = 'page:{}:{}'
+HITS_KEY = 'page_cache:hits'
+MISSES_KEY = 'page_cache:misses'
+PAGE_CACHE_TIMEOUT = 60 * 60 * 24
+# Only these GET params change cached pages, see get_page_cache_key().
+PAGE_CACHE_PARAMS = ('after', 'before', 'page')
+# Headers which response may vary on to be shared by anonymous visitors.
+SHARED_VARY_HEADERS = {'cookie', 'accept-encoding'}
+
+
+def get_generations(*names):
+    """Current values of generations, missing ones are started."""
+    keys = [GENERATION_KEY.format(name) for name in names]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            # Time based start never repeats values of evicted counter.
+            cache.add(key, int(time.time() * 1000), timeout=None)
+            values[key] = cache.get(key)
+    return tuple(values[key] for key in keys)
+
+
+def bump_generation(*names):
+    """Invalidate everything cached with these generations."""
+    for name in names:
+        key = GENERATION_KEY.format(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def count_page_cache(hit):
+    key = HITS_KEY if hit else MISSES_KEY
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def get_page_cache_stats():
+    """Hits, misses and hit rate of page cache."""
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0,
+    }
+
+
+def get_page_cache_key(request, generations):
+    """
+    Key of page by path and pagination params, None if request has other
+    params, so junk query strings don't fill the cache.
+    """
+    if any(
+        name not in PAGE_CACHE_PARAMS or len(request.GET.getlist(name)) > 1
+        for name in request.GET
+    ):
+        return None
+    query = urlencode(sorted(request.GET.items()))
+    version = '.'.join(str(value) for value in generations)
+    return PAGE_KEY.format(f'{request.path}?{query}', version)
+
+
+def is_shared_response(response):
+    """Response sets no cookies and varies on nothing personal."""
+    if response.cookies:
+        return False
+    vary = {
+        header.strip().lower()
+        for header in cc_delim_re.split(response.get('Vary', ''))
+        if header.strip()
+    }
+    return vary <= SHARED_VARY_HEADERS
+
+
+def cache_page_response(key, response, timeout=PAGE_CACHE_TIMEOUT):
+    """Store response in cache once it is rendered, if it can be shared."""
+    patch_vary_headers(response, ('Cookie',))
+
+    def store(rendered):
+        if is_shared_response(rendered):
+            cache.set(key, rendered, timeout)
+
+    if hasattr(response, 'render') and callable(response.render):
+        response.add_post_render_callback(store)
+    else:
+        store(response)
+    return response
@@ -0,0 +1,53 @@
+"""
+Approximate counters of rows kept in cache.
+
+Writes change counters by delta, reads never run COUNT(*) on every
+request. Missing counter is filled once by estimate() of its owner, so
+counts may drift by concurrent writes until the counter expires.
+"""
+from django.core.cache import cache
+
+COUNTER_KEY = 'count:{}'
+COUNTER_TIMEOUT = 60 * 60 * 24
+
+
+def get_count(name, estimate):
+    """Value of counter, estimated when it is missing."""
+    key = COUNTER_KEY.format(name)
+    value = cache.get(key)
+    if value is None:
+        value = estimate()
+        cache.add(key, value, timeout=COUNTER_TIMEOUT)
+    return value
+
+
+def get_counts(names, estimate):
+    """
+    Values of counters by names.
+    Missing ones are estimated at once by estimate(missing_names),
+    which returns dict of values, absent names count as 0.
+    """
+    keys = {name: COUNTER_KEY.format(name) for name in names}
+    values = cache.get_many(keys.values())
+    counts = {name: values.get(key) for name, key in keys.items()}
+    missing = [name for name, value in counts.items() if value is None]
+    if missing:
+        estimated = estimate(missing)
+        for name in missing:
+            counts[name] = estimated.get(name, 0)
+            cache.add(keys[name], counts[name], timeout=COUNTER_TIMEOUT)
+    return counts
+
+
+def change_count(*names, delta=1):
+    """Change loaded counters, missing ones are estimated on read."""
+    for name in names:
+        try:
+            cache.incr(COUNTER_KEY.format(name), delta)
+        except ValueError:
+            pass
+
+
+def drop_counts(*names):
+    """Forget counters, so they are estimated again."""
+    cache.delete_many([COUNTER_KEY.format(name) for name in names])
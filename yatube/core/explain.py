@@ -0,0 +1,120 @@
+"""
+Query plan advisor.
+
+Statements run while a view answers are captured and checked by
+EXPLAIN QUERY PLAN of SQLite. Full scans of tables and temporary
+B-trees built for ORDER BY or GROUP BY are reported with an index which
+would let the statement search and read rows in order instead.
+"""
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+TABLE_RE = re.compile(r'\bFROM "(\w+)"')
+WHERE_RE = re.compile(r'\bWHERE (.+?)(?: GROUP BY | ORDER BY | LIMIT |$)')
+ORDER_RE = re.compile(r'\bORDER BY (.+?)(?: LIMIT | OFFSET |$)')
+GROUP_RE = re.compile(r'\(([^()]*)\)')
+# Column compared with a parameter, not with column of joined table.
+COMPARE_RE = re.compile(
+    r'(?:"(\w+)"|\b(T\d+))\."(\w+)" (=|<|>|<=|>=|IN) (?=[\d\'-])')
+LIMIT_RE = re.compile(r'\bLIMIT \d+')
+ORDER_FIELD_RE = re.compile(r'"(\w+)"(?:\."(\w+)")? (ASC|DESC)')
+
+
+def explain(sql):
+    """Details of plan of statement, one line per step."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def find_problems(sql, plan):
+    """
+    Steps of plan which read whole table or sort rows.
+    Scan by index of statement without WHERE reads rows in order and
+    stops at LIMIT, so it is not a problem. Without LIMIT it still reads
+    the whole table.
+    """
+    problems = []
+    for detail in plan:
+        if 'TEMP B-TREE' in detail:
+            problems.append(detail)
+        elif detail.startswith('SCAN') and 'VIRTUAL TABLE' not in detail:
+            ordered = 'USING INDEX' in detail or 'COVERING INDEX' in detail
+            bounded = ' WHERE ' not in sql and LIMIT_RE.search(sql)
+            if not ordered or not bounded:
+                problems.append(detail)
+    return problems
+
+
+def get_conditions(sql):
+    """
+    Comparisons of WHERE as (table, alias, column, operator). Keyset
+    conditions like (created < x OR (created = x AND id < y)) are dropped,
+    other groups are opened.
+    """
+    where = WHERE_RE.search(sql)
+    if where is None:
+        return []
+    conditions = where.group(1)
+    while GROUP_RE.search(conditions):
+        conditions = GROUP_RE.sub(
+            lambda group: '' if ' OR ' in group.group(1) else group.group(1),
+            conditions)
+    return COMPARE_RE.findall(conditions)
+
+
+def recommend_index(sql):
+    """
+    Index for statement filtering main table and ordering it, like
+    "posts_post (author_id, created DESC, id DESC)": columns compared by
+    equality, then columns of ORDER BY or else one compared by range.
+    None when filter or order use other tables, so no index of one table
+    helps.
+    """
+    match = TABLE_RE.search(sql)
+    if match is None:
+        return None
+    table = match.group(1)
+    equal, ranges = [], []
+    for name, alias, column, operator in get_conditions(sql):
+        if name != table:
+            return None
+        if operator in ('=', 'IN'):
+            equal.append(column)
+        else:
+            ranges.append(column)
+    order = []
+    match = ORDER_RE.search(sql)
+    if match is not None:
+        for name, column, direction in ORDER_FIELD_RE.findall(
+                match.group(1)):
+            if name != table or not column:
+                return None
+            if column not in equal:
+                order.append(f'{column} {direction}')
+    columns = list(dict.fromkeys(equal)) + (order or ranges[:1])
+    if not columns:
+        return None
+    return f'{table} ({", ".join(columns)})'
+
+
+def check_request(send):
+    """
+    Problems of SELECT statements run by send(), a function making
+    request, as list of (sql, problems, recommended index).
+    """
+    with CaptureQueriesContext(connection) as context:
+        send()
+    checked = set()
+    results = []
+    for query in context.captured_queries:
+        sql = query['sql']
+        if not sql.startswith('SELECT') or sql in checked:
+            continue
+        checked.add(sql)
+        problems = find_problems(sql, explain(sql))
+        if problems:
+            results.append((sql, problems, recommend_index(sql)))
+    return results
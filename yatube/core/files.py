@@ -0,0 +1,202 @@
+"""
+Serving of static and media files.
+
+Files are streamed by FileResponse, so WSGI server sends them by
+sendfile() when it provides wsgi.file_wrapper. Precompressed siblings
+"name.br" and "name.gz" written by collectstatic are sent to clients
+which accept them. Responses have strong ETag, answer conditional and
+Range requests, and hashed static files, whose names change with
+content, are cached by browsers as immutable.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Preferred encodings first.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+BLOCK_SIZE = 64 * 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+class FileRange:
+    """
+    Part of open file which is read like whole file. It has no fileno(),
+    so server can't send it by sendfile() past the range.
+    """
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def get_accepted_encodings(request):
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip().partition('q=')[2]
+        try:
+            if quality and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def select_file(request, fullpath, stat):
+    """
+    Path, stat and encoding of file to send. Returns also whether
+    precompressed siblings exist, as response then depends on
+    Accept-Encoding.
+    """
+    accepted = get_accepted_encodings(request)
+    has_siblings = False
+    for encoding, suffix in ENCODINGS:
+        try:
+            sibling_stat = os.stat(fullpath + suffix)
+        except OSError:
+            continue
+        # Stale sibling of changed file is not used.
+        if sibling_stat.st_mtime < stat.st_mtime:
+            continue
+        has_siblings = True
+        if encoding in accepted or '*' in accepted:
+            return fullpath + suffix, sibling_stat, encoding, True
+    return fullpath, stat, None, has_siblings
+
+
+def get_etag(stat, encoding):
+    etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+    if encoding:
+        etag += f'-{encoding}'
+    return f'"{etag}"'
+
+
+def get_range(request, size, etag, last_modified):
+    """
+    Requested (start, length), None for the whole file. Raises ValueError
+    when range can't be satisfied.
+    """
+    match = RANGE_RE.match(request.META.get('HTTP_RANGE', '').strip())
+    if not match or not any(match.groups()):
+        # Several ranges are rare, whole file is sent instead.
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and (
+            parse_http_date_safe(if_range) != last_modified):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = min(int(last), size)
+        if not length:
+            raise ValueError
+        return size - length, length
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or last < first:
+        raise ValueError
+    return first, last - first + 1
+
+
+def set_cache_headers(response, etag, last_modified, cache_control):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = cache_control
+
+
+def open_file(fullpath, stat, request, etag, last_modified):
+    """FileResponse with whole file or its requested range."""
+    try:
+        file_range = get_range(request, stat.st_size, etag, last_modified)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+    file = open(fullpath, 'rb')
+    if file_range is None:
+        response = FileResponse(file)
+        response['Content-Length'] = stat.st_size
+    else:
+        start, length = file_range
+        response = FileResponse(FileRange(file, start, length), status=206)
+        response['Content-Length'] = length
+        response['Content-Range'] = (
+            f'bytes {start}-{start + length - 1}/{stat.st_size}')
+    response.block_size = BLOCK_SIZE
+    return response
+
+
+@require_safe
+def serve(request, path, document_root, cache_control='public, no-cache'):
+    """Send file from document_root, with ETag and Range support."""
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        fullpath = safe_join(document_root, path)
+        stat = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError):
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+    fullpath, stat, encoding, has_siblings = select_file(
+        request, fullpath, stat)
+    etag = get_etag(stat, encoding)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = open_file(fullpath, stat, request, etag, last_modified)
+        content_type, _ = mimetypes.guess_type(path)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        response['Accept-Ranges'] = 'bytes'
+        if encoding:
+            response['Content-Encoding'] = encoding
+    set_cache_headers(response, etag, last_modified, cache_control)
+    if has_siblings:
+        patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+
+def get_hashed_static_names():
+    # Manifest is loaded by storage only once, when it is created.
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return set(hashed_files.values())
+
+
+def serve_static(request, path):
+    """Collected static file, hashed names are cached forever."""
+    if path in get_hashed_static_names():
+        cache_control = IMMUTABLE
+    else:
+        cache_control = 'public, no-cache'
+    return serve(request, path, settings.STATIC_ROOT, cache_control)
+
+
+def serve_media(request, path):
+    """
+    Uploaded file or thumbnail, cached for MEDIA_MAX_AGE only. Name of
+    deleted upload may be used again, and names of thumbnails are made
+    of name of source and options, not of its content.
+    """
+    cache_control = f'public, max-age={settings.MEDIA_MAX_AGE}'
+    return serve(request, path, settings.MEDIA_ROOT, cache_control)
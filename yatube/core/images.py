@@ -0,0 +1,99 @@
+"""
+Ingest of uploaded images.
+
+Uploads are streamed to temporary files (see FILE_UPLOAD_HANDLERS), then
+images are shrunk to IMAGE_MAX_SIZE, rotated by EXIF orientation and
+re-encoded without metadata to WebP, or JPEG/PNG when Pillow is built
+without WebP. The result is written to temporary file too, so neither
+the original nor the result is held in memory.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import (TemporaryUploadedFile,
+                                            UploadedFile)
+from PIL import Image, ImageOps, features
+
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg', 'PNG': '.png'}
+SAVE_OPTIONS = {
+    'WEBP': {'method': 4},
+    'JPEG': {'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+}
+
+
+def has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        'transparency' in image.info)
+
+
+def get_format(image):
+    if features.check('webp'):
+        return 'WEBP'
+    return 'PNG' if has_alpha(image) else 'JPEG'
+
+
+def needs_ingest(upload, image):
+    """Small images without metadata are kept as they are."""
+    if getattr(image, 'is_animated', False):
+        return False
+    max_size = settings.IMAGE_MAX_SIZE
+    return (
+        upload.size > settings.IMAGE_KEEP_BYTES
+        or max(image.size) > max_size
+        or bool(image.getexif())
+    )
+
+
+def ingest_image(upload):
+    """Uploaded image normalized for storage, as new uploaded file."""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        if not needs_ingest(upload, image):
+            upload.seek(0)
+            return upload
+        max_size = settings.IMAGE_MAX_SIZE
+        # JPEG is decoded at reduced scale right away.
+        image.draft('RGB', (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        image_format = get_format(image)
+        mode = 'RGBA' if has_alpha(image) else 'RGB'
+        if image_format == 'JPEG':
+            mode = 'RGB'
+        if image.mode != mode:
+            image = image.convert(mode)
+        name = os.path.splitext(upload.name)[0] + EXTENSIONS[image_format]
+        result = TemporaryUploadedFile(
+            name, Image.MIME[image_format], 0, None)
+        image.save(
+            result.file,
+            image_format,
+            quality=settings.IMAGE_QUALITY,
+            exif=b'',
+            **SAVE_OPTIONS[image_format],
+        )
+    result.file.flush()
+    result.size = result.file.tell()
+    result.seek(0)
+    return result
+
+
+class IngestImagesMixin:
+    """
+    Ingest new uploads of image fields listed in ingest_fields.
+    Result is added to form files, so it is closed with other uploads
+    of request.
+    """
+    ingest_fields = ()
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name in self.ingest_fields:
+            value = cleaned_data.get(name)
+            if isinstance(value, UploadedFile):
+                image = ingest_image(value)
+                if image is not value:
+                    self.files.appendlist(self.add_prefix(name), image)
+                cleaned_data[name] = image
+        return cleaned_data
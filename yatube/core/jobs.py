@@ -0,0 +1,159 @@
+"""
+Background jobs stored in database.
+
+Functions decorated by @task get delay(), which saves Job row in the
+current transaction, so job is visible to workers only if the request
+has been committed. Workers of run_jobs command claim jobs by one UPDATE
+and keep them for JOB_VISIBILITY_TIMEOUT seconds: if worker dies, job is
+claimed again after that. Failed jobs are retried with exponential
+backoff up to max_attempts. Jobs with the same key are queued once
+until the job finishes, key of done or failed job is cleared.
+"""
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def task(max_attempts=None):
+    """Add delay() which queues call of function for worker."""
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+
+        def delay(*args, key=None, run_at=None, **kwargs):
+            return enqueue(
+                name, args, kwargs,
+                key=key,
+                run_at=run_at,
+                max_attempts=max_attempts,
+            )
+        func.delay = delay
+        return func
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, key=None, run_at=None,
+            max_attempts=None):
+    """
+    Queue job, arguments must be JSON serializable.
+    If queued or running job with the key exists, it is returned instead
+    of new one.
+    """
+    job = Job(
+        name=name,
+        arguments=json.dumps({'args': list(args), 'kwargs': kwargs or {}}),
+        key=key,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if key is None:
+        job.save()
+        return job
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        existing = Job.objects.filter(key=key).first()
+        if existing is not None:
+            return existing
+        # Job with the key has finished meanwhile.
+        job.save()
+    return job
+
+
+def get_claimable(now):
+    return Q(status=Job.QUEUED, run_at__lte=now) | Q(
+        status=Job.RUNNING,
+        locked_until__lte=now,
+        attempts__lt=F('max_attempts'),
+    )
+
+
+def claim_jobs(limit):
+    """Lock up to limit jobs ready to run for this worker."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    claimable = get_claimable(now)
+    ids = Job.objects.filter(claimable).order_by(
+        'run_at', 'id').values('id')[:limit]
+    claimed = Job.objects.filter(claimable, id__in=ids).update(
+        status=Job.RUNNING,
+        token=token,
+        attempts=F('attempts') + 1,
+        locked_until=now + timedelta(
+            seconds=settings.JOB_VISIBILITY_TIMEOUT),
+    )
+    if not claimed:
+        return []
+    return list(Job.objects.filter(token=token, status=Job.RUNNING))
+
+
+def fail_expired_jobs():
+    """Give up jobs which timed out on the last attempt."""
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_until__lte=timezone.now(),
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.FAILED,
+        key=None,
+        last_error='Visibility timeout expired',
+        finished=timezone.now(),
+    )
+
+
+def run_job(job):
+    """Run claimed job, return True if it succeeded."""
+    try:
+        func = import_string(job.name)
+        arguments = json.loads(job.arguments)
+        with transaction.atomic():
+            func(*arguments['args'], **arguments['kwargs'])
+    except Exception:
+        logger.exception('Job %s failed', job)
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            changes = {'status': Job.FAILED, 'key': None, 'finished': now}
+        else:
+            delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            changes = {
+                'status': Job.QUEUED,
+                'run_at': now + timedelta(seconds=delay),
+            }
+        # Token check skips jobs already claimed again by other worker.
+        Job.objects.filter(pk=job.pk, token=job.token).update(
+            last_error=traceback.format_exc(),
+            locked_until=None,
+            **changes,
+        )
+        return False
+    Job.objects.filter(pk=job.pk, token=job.token).update(
+        status=Job.DONE,
+        key=None,
+        locked_until=None,
+        finished=timezone.now(),
+    )
+    return True
+
+
+def run_pending_jobs():
+    """Run jobs ready now in this thread, return number of them."""
+    count = 0
+    jobs = claim_jobs(settings.JOB_BATCH_SIZE)
+    while jobs:
+        for job in jobs:
+            run_job(job)
+            count += 1
+        jobs = claim_jobs(settings.JOB_BATCH_SIZE)
+    return count
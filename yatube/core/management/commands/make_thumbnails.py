@@ -0,0 +1,22 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.thumbnails import generate_thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Queue jobs making missing thumbnails of uploaded images.'
+
+    def handle(self, *args, **options):
+        for label in settings.THUMBNAIL_GEOMETRIES:
+            model_label, field_name = label.rsplit('.', 1)
+            model = apps.get_model(model_label)
+            images = model.objects.exclude(**{field_name: ''}).values_list(
+                'pk', field_name)
+            count = 0
+            for pk, file_name in images.iterator():
+                generate_thumbnails.delay(
+                    model_label, pk, field_name, file_name)
+                count += 1
+            self.stdout.write(f'{label}: {count} images queued')
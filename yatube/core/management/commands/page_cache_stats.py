@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import get_page_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Show hits, misses and hit rate of page cache.'
+
+    def handle(self, *args, **options):
+        stats = get_page_cache_stats()
+        self.stdout.write(
+            f'Hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit rate: {stats["hit_rate"]:.1%}'
+        )
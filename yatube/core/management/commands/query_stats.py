@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.queries import clear_query_stats, get_query_stats
+
+
+class Command(BaseCommand):
+    help = 'Show queries per request of every view, recorded by QUERY_STATS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Drop recorded numbers after they are shown.',
+        )
+
+    def handle(self, *args, **options):
+        stats = get_query_stats()
+        if not stats:
+            self.stdout.write('No requests recorded.')
+        for view, numbers in stats.items():
+            requests = numbers['requests'] or 1
+            self.stdout.write(
+                f'{view}: {numbers["requests"]} requests, '
+                f'{numbers["queries"] / requests:.1f} queries, '
+                f'{numbers["repeated"] / requests:.1f} repeated, '
+                f'{numbers["time_us"] / requests / 1000:.1f} ms of SQL, '
+                f'{numbers["over_budget"]} over budget'
+            )
+        if options['clear']:
+            clear_query_stats()
@@ -0,0 +1,72 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from core.jobs import claim_jobs, fail_expired_jobs, run_job
+
+
+def work(job):
+    """Run job in pool, connection of thread is closed after it."""
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs in thread or process pool.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.JOB_WORKERS,
+            help='Number of jobs run at the same time.',
+        )
+        parser.add_argument(
+            '--processes', action='store_true',
+            help='Run jobs in processes instead of threads.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit when there are no jobs ready to run.',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if options['processes']:
+            # Forked workers must open their own connections.
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers)
+        else:
+            pool = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='jobs')
+        self.results = {True: 0, False: 0}
+        try:
+            with pool:
+                self.run(pool, workers, options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping, running jobs are finished first.')
+        self.stdout.write(
+            f'Jobs done: {self.results[True]}, '
+            f'failed: {self.results[False]}'
+        )
+
+    def run(self, pool, workers, once):
+        """Keep pool busy with claimed jobs."""
+        running = set()
+        while True:
+            for future in [future for future in running if future.done()]:
+                running.discard(future)
+                self.results[future.result()] += 1
+            fail_expired_jobs()
+            jobs = []
+            if len(running) < workers:
+                jobs = claim_jobs(workers - len(running))
+            running.update(pool.submit(work, job) for job in jobs)
+            if jobs:
+                continue
+            if once and not running:
+                return
+            time.sleep(settings.JOB_POLL_INTERVAL)
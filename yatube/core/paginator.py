@@ -0,0 +1,309 @@
+import base64
+import binascii
+import datetime
+import json
+from math import ceil
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+
+PAGE_WINDOW = 3
+CURSOR_PARAMS = ('after', 'before', 'page')
+
+
+class InvalidCursor(Exception):
+    """Cursor token can't be decoded."""
+
+
+def encode_cursor(number, values):
+    """Pack page number and ordering key values to url safe token."""
+    values = [
+        value.isoformat() if isinstance(value, datetime.datetime) else value
+        for value in values
+    ]
+    data = json.dumps([number, *values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """
+    Unpack token to page number and ordering key values, parsed by
+    model fields of ordering.
+    """
+    try:
+        padding = '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(token + padding))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(token)
+    if not isinstance(data, list) or len(data) != len(fields) + 1:
+        raise InvalidCursor(token)
+    number, *values = data
+    if not isinstance(number, int) or number < 1:
+        raise InvalidCursor(token)
+    if any(value is None or isinstance(value, (dict, list))
+           for value in values):
+        raise InvalidCursor(token)
+    try:
+        values = [
+            field.to_python(value) for field, value in zip(fields, values)]
+    except (ValidationError, TypeError, ValueError):
+        raise InvalidCursor(token)
+    if any(value is None for value in values):
+        raise InvalidCursor(token)
+    return number, values
+
+
+class PageLink:
+    """Link to page of cursor paginator."""
+    def __init__(self, number, query):
+        self.number = number
+        self.query = query
+
+
+class CursorPage:
+    """Page of objects with links to neighbour pages."""
+    def __init__(self, object_list, number, paginator,
+                 previous_links=(), next_links=(),
+                 previous_query=None, next_query=None):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self.previous_links = previous_links
+        self.next_links = next_links
+        self.previous_query = previous_query
+        self.next_query = next_query
+        self.first_query = paginator.build_query()
+
+    def __repr__(self):
+        return f'<Page {self.number}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def has_next(self):
+        return self.next_query is not None
+
+    def has_previous(self):
+        return self.previous_query is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class CursorPaginator:
+    """
+    Keyset paginator.
+    Pages are addressed by ordering key of neighbour object
+    (?after=<token>, ?before=<token>), so every page costs the same
+    as the first one: no COUNT(*) and no OFFSET.
+    Total count is known only if count (number or callable) is given,
+    usually by maintained counter.
+    """
+    def __init__(self, object_list, per_page, ordering=('-created', '-id'),
+                 window=PAGE_WINDOW, params=None, count=None, **kwargs):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip('-') for field in self.ordering)
+        self.window = window
+        self.params = params or {}
+        self._count = count
+
+    @cached_property
+    def key_fields(self):
+        """Model fields or annotations of ordering, to parse cursors."""
+        annotations = self.object_list.query.annotations
+        meta = self.object_list.model._meta
+        return [
+            annotations[name].output_field if name in annotations
+            else meta.get_field(name)
+            for name in self.fields
+        ]
+
+    @cached_property
+    def count(self):
+        """Number of objects from counter, None if unknown."""
+        return self._count() if callable(self._count) else self._count
+
+    @cached_property
+    def num_pages(self):
+        if self.count is None:
+            return None
+        return max(ceil(self.count / self.per_page), 1)
+
+    def build_query(self, **cursor):
+        """Query string of page link, other GET params are kept."""
+        params = {
+            key: value for key, value in self.params.items()
+            if key not in CURSOR_PARAMS
+        }
+        params.update(cursor)
+        return urlencode(params)
+
+    def get_key(self, obj):
+        """Values of ordering fields of object or values() row."""
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def keyset_filter(self, values, reverse=False):
+        """Condition for objects placed after key (before if reverse)."""
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            name = self.fields[index]
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for equal_name, value in zip(self.fields[:index], values):
+                step &= Q(**{equal_name: value})
+            condition |= step
+        return condition
+
+    def reversed_ordering(self):
+        return tuple(
+            field[1:] if field.startswith('-') else f'-{field}'
+            for field in self.ordering
+        )
+
+    def get_ordered(self, key=None, reverse=False):
+        """Object list in order of paginator from key, reversed if asked."""
+        ordering = self.reversed_ordering() if reverse else self.ordering
+        queryset = self.object_list.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self.keyset_filter(key, reverse))
+        return queryset
+
+    def get_objects(self, key=None, reverse=False, limit=None, offset=0):
+        """
+        Objects placed after key, or before it in reversed order if
+        reverse, from offset.
+        """
+        return list(
+            self.get_ordered(key, reverse)[offset:offset + limit])
+
+    def get_keys(self, key=None, reverse=False, limit=None, offset=0):
+        """Ordering keys of objects which get_objects() would return."""
+        return list(
+            self.get_ordered(key, reverse)
+            .values_list(*self.fields)[offset:offset + limit]
+        )
+
+    def get_page(self, params):
+        """Page by GET params, broken cursor gives the first page."""
+        self.params = params
+        try:
+            if params.get('after'):
+                return self.page(after=params['after'])
+            if params.get('before'):
+                return self.page(before=params['before'])
+            if params.get('page'):
+                return self.page(number=int(params['page']))
+        except (InvalidCursor, ValidationError, TypeError, ValueError,
+                IndexError):
+            pass
+        return self.page()
+
+    def page(self, after=None, before=None, number=None):
+        if after is not None:
+            number, key = decode_cursor(after, self.key_fields)
+            object_list = self.get_objects(key, limit=self.per_page)
+            number += 1
+        elif before is not None:
+            number, key = decode_cursor(before, self.key_fields)
+            object_list = self.get_objects(
+                key, reverse=True, limit=self.per_page)[::-1]
+            number -= 1
+            if len(object_list) < self.per_page:
+                return self.page()
+        elif number is not None and number > 1:
+            # Legacy ?page=N links, OFFSET is used only here.
+            object_list = self.get_objects(
+                limit=self.per_page, offset=(number - 1) * self.per_page)
+        else:
+            number = 1
+            object_list = self.get_objects(limit=self.per_page)
+        if not object_list:
+            if number > 1:
+                return self.page()
+            return CursorPage(object_list, number, self)
+        return self._link_page(object_list, max(number, 1))
+
+    def _link_page(self, object_list, number):
+        """Fetch keys around page to build bounded window of links."""
+        per_page = self.per_page
+        first_key = self.get_key(object_list[0])
+        last_key = self.get_key(object_list[-1])
+        ahead = self.get_keys(
+            last_key, limit=(self.window - 1) * per_page + 1)
+        behind = self.get_keys(
+            first_key, reverse=True, limit=self.window * per_page + 1)
+        previous_keys = []
+        for step in range(1, self.window + 1):
+            if len(behind) <= (step - 1) * per_page:
+                break
+            if len(behind) <= step * per_page:
+                previous_keys.append(None)
+                break
+            previous_keys.append(behind[step * per_page])
+        if not previous_keys or previous_keys[-1] is None:
+            # Top of the list is in sight, so the page number is exact.
+            number = len(previous_keys) + 1
+        previous_links = []
+        for step, key in enumerate(previous_keys, start=1):
+            query = self.build_query()
+            if key is not None:
+                query = self.build_query(
+                    after=encode_cursor(number - step - 1, key))
+            previous_links.insert(0, PageLink(number - step, query))
+        next_links = []
+        keys = [last_key] + [
+            ahead[index] for index in range(
+                per_page - 1, len(ahead) - 1, per_page)
+        ]
+        for step, key in enumerate(keys[:self.window], start=1):
+            if len(ahead) <= (step - 1) * per_page:
+                break
+            next_links.append(PageLink(
+                number + step,
+                self.build_query(after=encode_cursor(number + step - 1, key)),
+            ))
+        previous_query = None
+        if previous_links:
+            previous_query = self.build_query(
+                before=encode_cursor(number, first_key))
+        next_query = next_links[0].query if next_links else None
+        return CursorPage(
+            object_list, number, self,
+            previous_links=previous_links,
+            next_links=next_links,
+            previous_query=previous_query,
+            next_query=next_query,
+        )
+
+
+class CountedPaginator(Paginator):
+    """
+    Paginator taking number of objects from counter (number or
+    callable) instead of COUNT(*) of object list.
+    """
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @cached_property
+    def count(self):
+        if self._count is None:
+            return super().count
+        return self._count() if callable(self._count) else self._count
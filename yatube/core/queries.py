@@ -0,0 +1,158 @@
+"""
+Query budgets of views.
+
+QueryBudgetMiddleware records SQL queries of every request through
+connection.execute_wrapper: their number, repeated ones and total time.
+Views declare query_budget, requests over it are logged as warnings.
+With QUERY_STATS numbers are summed up by view name in cache, see
+query_stats command. Every view gets numbered slot once, so views are
+listed without rewriting shared set.
+"""
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Number of views with stats, names are kept in numbered slots.
+VIEWS_KEY = 'queries:views'
+VIEW_KEY = 'queries:view:{}'
+SLOT_KEY = 'queries:slot:{}'
+STATS_KEY = 'queries:{}:{}'
+STATS_FIELDS = ('requests', 'queries', 'repeated', 'time_us', 'over_budget')
+
+
+class QueryRecorder:
+    """Execute wrapper which counts and times queries."""
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[sql] += 1
+
+    @property
+    def repeated(self):
+        """Queries whose SQL has run before with any params, like N+1."""
+        return sum(count - 1 for count in self.statements.values())
+
+    def get_repeated_statements(self):
+        return [
+            (sql, count) for sql, count in self.statements.most_common()
+            if count > 1
+        ]
+
+
+@contextmanager
+def record_queries():
+    recorder = QueryRecorder()
+    with connection.execute_wrapper(recorder):
+        yield recorder
+
+
+def get_query_budget(view_func):
+    """Budget declared by view class or function, None if not declared."""
+    view = getattr(view_func, 'view_class', view_func)
+    return getattr(view, 'query_budget', None)
+
+
+def increment(key, delta):
+    if not cache.add(key, delta, timeout=None):
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            cache.set(key, delta, timeout=None)
+
+
+def register_view(view_name):
+    """Put view to a new slot, only the first request of view does it."""
+    key = VIEW_KEY.format(view_name)
+    if cache.get(key) is not None or not cache.add(key, 1, timeout=None):
+        return
+    cache.add(VIEWS_KEY, 0, timeout=None)
+    cache.set(SLOT_KEY.format(cache.incr(VIEWS_KEY)), view_name, timeout=None)
+
+
+def get_views():
+    count = cache.get(VIEWS_KEY) or 0
+    slots = [SLOT_KEY.format(number) for number in range(1, count + 1)]
+    return sorted(set(cache.get_many(slots).values()))
+
+
+def save_query_stats(view_name, recorder, over_budget):
+    register_view(view_name)
+    values = (
+        1,
+        recorder.count,
+        recorder.repeated,
+        int(recorder.duration * 1000000),
+        int(over_budget),
+    )
+    for field, value in zip(STATS_FIELDS, values):
+        if value:
+            increment(STATS_KEY.format(view_name, field), value)
+
+
+def get_query_stats():
+    """Summed numbers of every recorded view, by view name."""
+    views = get_views()
+    keys = [
+        STATS_KEY.format(view, field)
+        for view in views for field in STATS_FIELDS
+    ]
+    values = cache.get_many(keys)
+    return {
+        view: {
+            field: values.get(STATS_KEY.format(view, field), 0)
+            for field in STATS_FIELDS
+        }
+        for view in views
+    }
+
+
+def clear_query_stats():
+    views = get_views()
+    count = cache.get(VIEWS_KEY) or 0
+    cache.delete_many([
+        *(STATS_KEY.format(view, field)
+          for view in views for field in STATS_FIELDS),
+        *(VIEW_KEY.format(view) for view in views),
+        *(SLOT_KEY.format(number) for number in range(1, count + 1)),
+        VIEWS_KEY,
+    ])
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is None:
+            return response
+        budget = get_query_budget(match.func)
+        over_budget = budget is not None and recorder.count > budget
+        if over_budget:
+            logger.warning(
+                'View %s made %d queries over budget of %d '
+                '(%d repeated, %.1f ms): %s',
+                match.view_name, recorder.count, budget, recorder.repeated,
+                recorder.duration * 1000, request.path,
+            )
+        if settings.QUERY_STATS:
+            save_query_stats(match.view_name, recorder, over_budget)
+        return response
@@ -0,0 +1,67 @@
+"""
+Storage of collected static files.
+
+Files get names with hash of content, as ManifestStaticFilesStorage does,
+and text files get precompressed siblings "name.gz" and "name.br" which
+are sent by core.files.serve_static. Brotli is used only when the brotli
+package is installed.
+"""
+import gzip
+import io
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.json', '.xml', '.html',
+)
+
+
+def compress_gzip(data):
+    buffer = io.BytesIO()
+    # Fixed mtime keeps archive the same for the same file.
+    with gzip.GzipFile(
+            fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as file:
+        file.write(data)
+    return buffer.getvalue()
+
+
+def get_compressors():
+    compressors = [('.gz', compress_gzip)]
+    if brotli is not None:
+        compressors.append(('.br', brotli.compress))
+    return compressors
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # Link to missing file stays broken instead of failing whole page.
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if not name.endswith(COMPRESSED_EXTENSIONS):
+                continue
+            for compressed_name in self.compress(name):
+                yield name, compressed_name, True
+
+    def compress(self, name):
+        """Write siblings which are smaller than file, return their names."""
+        with self.open(name) as file:
+            data = file.read()
+        written = []
+        for suffix, compress in get_compressors():
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            with open(self.path(name + suffix), 'wb') as file:
+                file.write(compressed)
+            written.append(name + suffix)
+        return written
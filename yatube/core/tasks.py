@@ -0,0 +1,12 @@
+from django.core.mail import EmailMultiAlternatives
+
+from .jobs import task
+
+
+@task()
+def send_email(subject, body, from_email, to, html_message=None):
+    """Send email prepared in request."""
+    message = EmailMultiAlternatives(subject, body, from_email, to)
+    if html_message:
+        message.attach_alternative(html_message, 'text/html')
+    message.send()
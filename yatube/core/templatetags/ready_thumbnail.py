@@ -0,0 +1,11 @@
+from django import template
+
+from core.thumbnails import get_ready_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def ready_thumbnail(file_, geometry_string, **options):
+    """Thumbnail made by background worker, None until it is ready."""
+    return get_ready_thumbnail(file_, geometry_string, **options)
@@ -0,0 +1,24 @@
+"""Helpers for tests of other apps."""
+from .queries import get_query_budget, record_queries
+
+
+class QueryBudgetTestMixin:
+    """Check that views stay within their declared query_budget."""
+    def assertQueryBudget(self, url, client=None):
+        """Request url and compare number of queries with its budget."""
+        client = client or self.client
+        with record_queries() as recorder:
+            response = client.get(url)
+        budget = get_query_budget(response.resolver_match.func)
+        self.assertIsNotNone(budget, f'View of {url} has no query_budget')
+        repeated = ''.join(
+            f'\n{count} x {sql}'
+            for sql, count in recorder.get_repeated_statements()
+        )
+        self.assertLessEqual(
+            recorder.count,
+            budget,
+            f'{url} made {recorder.count} queries, budget is {budget}'
+            f'{repeated}',
+        )
+        return response
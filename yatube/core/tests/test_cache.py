@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+from core.cache_backends import SQLiteCache
+
+
+def make_cache(location, **options):
+    return SQLiteCache(location, {'OPTIONS': options})
+
+
+def increment_many(location, times):
+    cache = make_cache(location)
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = make_cache(self.location)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_operations(self):
+        """Values survive round trip, add and incr are checked."""
+        cache = self.cache
+        cache.set('object', {'posts': {1, 2}})
+        self.assertEqual(cache.get('object'), {'posts': {1, 2}})
+        self.assertFalse(cache.add('object', 'other'))
+        self.assertTrue(cache.add('counter', 1))
+        self.assertEqual(cache.incr('counter', 5), 6)
+        self.assertEqual(cache.decr('counter'), 5)
+        self.assertIs(cache.get('counter'), 5)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        cache.set('flag', True)
+        self.assertIs(cache.get('flag'), True)
+        self.assertEqual(
+            cache.get_many(['object', 'counter', 'missing']),
+            {'object': {'posts': {1, 2}}, 'counter': 5},
+        )
+        cache.delete_many(['object', 'counter'])
+        self.assertIsNone(cache.get('object'))
+        self.assertEqual(cache.get('missing', 0), 0)
+
+    def test_expiration(self):
+        """Expired keys are missing and can be added again."""
+        cache = self.cache
+        cache.set('key', 'value', timeout=0.1)
+        self.assertTrue(cache.has_key('key'))
+        time.sleep(0.2)
+        self.assertFalse(cache.has_key('key'))
+        self.assertTrue(cache.add('key', 'new', timeout=None))
+        self.assertEqual(cache.get('key'), 'new')
+
+    def test_cull(self):
+        """Oldest keys with timeout are culled, persistent ones stay."""
+        cache = make_cache(self.location, MAX_ENTRIES=50, CULL_FREQUENCY=2)
+        cache.set('persistent', 1, timeout=None)
+        cache.set_many({f'key:{i}': i for i in range(150)}, timeout=60)
+        self.assertEqual(cache.get('persistent'), 1)
+        self.assertIsNone(cache.get('key:0'))
+        self.assertEqual(cache.get('key:149'), 149)
+
+    def test_shared_between_processes(self):
+        """Workers see writes of each other, incr loses nothing."""
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('spawn')
+        workers = [
+            context.Process(target=increment_many, args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(make_cache(self.location).get('counter'), 200)
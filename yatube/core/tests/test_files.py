@@ -0,0 +1,150 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, SimpleTestCase, override_settings
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+TEMP_STATIC_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+CSS = b'body { color: black; }\n' * 100
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    STATIC_ROOT=TEMP_STATIC_ROOT,
+    STATICFILES_STORAGE='core.storage.CompressedManifestStaticFilesStorage',
+)
+class TestFileServing(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'posts'))
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts/file.css'), 'wb') as f:
+            f.write(CSS)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'posts/file.css.gz'),
+                  'wb') as f:
+            f.write(gzip.compress(CSS))
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(TEMP_STATIC_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_collected_static_files(self):
+        """Static files get hashed names and gzip siblings."""
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        name = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        self.assertNotEqual(name, 'css/bootstrap.min.css')
+        with open(os.path.join(TEMP_STATIC_ROOT, name), 'rb') as file:
+            original = file.read()
+        with gzip.open(os.path.join(TEMP_STATIC_ROOT, name + '.gz')) as file:
+            self.assertEqual(file.read(), original)
+        # Images are not compressed again.
+        self.assertFalse(os.path.exists(
+            os.path.join(TEMP_STATIC_ROOT, 'img/logo.png.gz')))
+
+    def test_hashed_static_file_is_immutable(self):
+        """Hashed static file is cached forever, other only revalidated."""
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        name = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        response = self.client.get(f'/static/{name}')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response['Content-Type'], 'text/css')
+        response.close()
+        response = self.client.get('/static/css/bootstrap.min.css')
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+        response.close()
+
+    def test_precompressed_sibling(self):
+        """Gzip sibling is sent to clients accepting gzip only."""
+        response = self.client.get(
+            '/media/posts/file.css', HTTP_ACCEPT_ENCODING='gzip, br;q=0')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), CSS)
+        response = self.client.get('/media/posts/file.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.MEDIA_MAX_AGE}',
+        )
+
+    def test_thumbnails_not_immutable(self):
+        """Thumbnail may be made again under the same name."""
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, 'cache'), exist_ok=True)
+        with open(os.path.join(TEMP_MEDIA_ROOT, 'cache/thumb.css'),
+                  'wb') as f:
+            f.write(CSS)
+        response = self.client.get('/media/cache/thumb.css')
+        self.assertEqual(
+            response['Cache-Control'],
+            f'public, max-age={settings.MEDIA_MAX_AGE}',
+        )
+        response.close()
+
+    def test_conditional_request(self):
+        """Request with current ETag gets 304 without body."""
+        response = self.client.get('/media/posts/file.css')
+        response.close()
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        response = self.client.get(
+            '/media/posts/file.css', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get(
+            '/media/posts/file.css', HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_range_requests(self):
+        """Ranges are sent with 206, wrong ranges get 416."""
+        cases = (
+            ('bytes=0-9', CSS[:10]),
+            ('bytes=10-', CSS[10:]),
+            ('bytes=-5', CSS[-5:]),
+            ('bytes=2290-5000', CSS[2290:]),
+        )
+        for header, content in cases:
+            with self.subTest(header=header):
+                response = self.client.get(
+                    '/media/posts/file.css', HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(
+                    b''.join(response.streaming_content), content)
+                self.assertEqual(int(response['Content-Length']), len(content))
+                self.assertTrue(response['Content-Range'].endswith(
+                    f'/{len(CSS)}'))
+        response = self.client.get(
+            '/media/posts/file.css', HTTP_RANGE='bytes=10-19')
+        # sendfile() of descriptor would ignore the range.
+        self.assertFalse(hasattr(response.file_to_stream, 'fileno'))
+        response.close()
+        response = self.client.get(
+            '/media/posts/file.css', HTTP_RANGE=f'bytes={len(CSS)}-')
+        self.assertEqual(response.status_code, 416)
+        response = self.client.get(
+            '/media/posts/file.css',
+            HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"old"')
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_missing_files(self):
+        """Missing files, directories and paths outside root are 404."""
+        for url in ('/media/posts/none.css', '/media/posts/',
+                    '/media/../manage.py'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
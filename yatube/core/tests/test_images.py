@@ -0,0 +1,66 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from core.images import ingest_image
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+
+
+def make_photo(size=(3000, 1000), orientation=6):
+    """JPEG like from phone camera: big and rotated by EXIF."""
+    image = Image.effect_noise(size, 64).convert('RGB')
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = 'Camera'
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=95, exif=exif.tobytes())
+    return SimpleUploadedFile('photo.jpeg', buffer.getvalue(), 'image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=1024)
+class TestImageIngest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_photo_is_normalized(self):
+        """Photo is rotated, shrunk and saved without EXIF."""
+        upload = make_photo()
+        result = ingest_image(upload)
+        self.assertLess(result.size, upload.size)
+        self.assertTrue(result.temporary_file_path())
+        with Image.open(result) as image:
+            self.assertEqual(image.size, (341, 1024))
+            self.assertFalse(image.getexif())
+        self.assertTrue(result.name.startswith('photo.'))
+        self.assertNotEqual(result.name, upload.name)
+
+    def test_small_image_kept(self):
+        """Small image without metadata is stored as is."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, 'PNG')
+        upload = SimpleUploadedFile('small.png', buffer.getvalue())
+        self.assertIs(ingest_image(upload), upload)
+
+    def test_post_form_ingests_image(self):
+        """Post is created with normalized image."""
+        user = User.objects.create_user(username='test_user')
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse('posts:post_create'),
+            {'text': 'Фото', 'image': make_photo()},
+        )
+        post = Post.objects.get(text='Фото')
+        self.assertNotEqual(post.image.name, 'posts/photo.jpeg')
+        self.assertEqual(max(post.image.width, post.image.height), 1024)
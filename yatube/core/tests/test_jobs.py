@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from core.jobs import claim_jobs, run_job, run_pending_jobs, task
+from core.models import Job
+
+User = get_user_model()
+CALLS = []
+
+
+@task()
+def remember(value):
+    CALLS.append(value)
+
+
+@task(max_attempts=2)
+def fail():
+    raise RuntimeError('Job failed')
+
+
+@override_settings(JOB_RETRY_DELAY=60)
+class TestJobs(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_run_job(self):
+        """Job is run by worker, not by delay()."""
+        job = remember.delay('value')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(run_pending_jobs(), 1)
+        self.assertEqual(CALLS, ['value'])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_idempotency_key(self):
+        """Job with the same key is queued once until it finishes."""
+        job = remember.delay(1, key='once')
+        self.assertEqual(remember.delay(2, key='once'), job)
+        claim_jobs(1)
+        self.assertEqual(remember.delay(3, key='once'), job)
+        run_job(Job.objects.get(pk=job.pk))
+        remember.delay(4, key='once')
+        run_pending_jobs()
+        self.assertEqual(CALLS, [1, 4])
+
+    def test_failed_job_key_queued_again(self):
+        """Key of failed job can be queued again."""
+        job = fail.delay(key='failing')
+        run_pending_jobs()
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNone(job.key)
+        self.assertNotEqual(fail.delay(key='failing').pk, job.pk)
+
+    def test_retries(self):
+        """Failed job is retried later, then given up."""
+        job = fail.delay()
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('Job failed', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_visibility_timeout(self):
+        """Job of lost worker is claimed again, late result is ignored."""
+        remember.delay('value')
+        lost, = claim_jobs(1)
+        self.assertEqual(claim_jobs(1), [])
+        Job.objects.filter(pk=lost.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1))
+        job, = claim_jobs(1)
+        self.assertEqual(job.attempts, 2)
+        run_job(lost)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.RUNNING)
+        run_job(job)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.DONE)
+
+    def test_password_reset_email_queued(self):
+        """Password reset email is sent by worker."""
+        User.objects.create_user(
+            username='test_user', email='user@test.ru', password='pass')
+        Client().post(
+            reverse('users:password_reset'), {'email': 'user@test.ru'})
+        self.assertEqual(len(mail.outbox), 0)
+        run_pending_jobs()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@test.ru'])
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import urlencode
+from core.paginator import (CursorPaginator, InvalidCursor, decode_cursor,
+                            encode_cursor)
+from posts.models import Post
+
+User = get_user_model()
+
+
+class CursorPaginatorTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(95)
+        )
+        cls.posts = list(Post.objects.order_by('-created', '-id'))
+
+    def get_page(self, query=''):
+        paginator = CursorPaginator(Post.objects.all(), 10, window=2)
+        return paginator.get_page(QueryDict(query))
+
+    def test_walk_forward_and_back(self):
+        """Following next and previous links visits every post once."""
+        page = self.get_page()
+        seen = list(page)
+        while page.has_next():
+            page = self.get_page(page.next_query)
+            seen.extend(page)
+        self.assertEqual(seen, self.posts)
+        self.assertEqual(page.number, 10)
+        self.assertEqual(len(page), 5)
+        while page.has_previous():
+            page = self.get_page(page.previous_query)
+        self.assertEqual(page.number, 1)
+        self.assertEqual(list(page), self.posts[:10])
+
+    def test_bounded_window(self):
+        """Only pages inside window are linked."""
+        page = self.get_page()
+        for _ in range(4):
+            page = self.get_page(page.next_query)
+        self.assertEqual(page.number, 5)
+        self.assertEqual(list(page), self.posts[40:50])
+        self.assertEqual(
+            [link.number for link in page.previous_links], [3, 4])
+        self.assertEqual([link.number for link in page.next_links], [6, 7])
+        page_three = self.get_page(page.previous_links[0].query)
+        self.assertEqual(page_three.number, 3)
+        self.assertEqual(list(page_three), self.posts[20:30])
+        page_seven = self.get_page(page.next_links[-1].query)
+        self.assertEqual(page_seven.number, 7)
+        self.assertEqual(list(page_seven), self.posts[60:70])
+
+    def test_broken_cursor(self):
+        """Broken token gives the first page."""
+        page = self.get_page('after=broken')
+        self.assertEqual(page.number, 1)
+        self.assertEqual(list(page), self.posts[:10])
+
+    def test_malformed_cursor(self):
+        """Key of wrong length or type gives the first page, not 500."""
+        fields = CursorPaginator(Post.objects.all(), 10).key_fields
+        tokens = [
+            encode_cursor(2, ['2020-01-01']),
+            encode_cursor(2, ['bad', 3]),
+            encode_cursor(2, [{'a': 1}, 3]),
+            encode_cursor(2, ['2020-01-01', [3]]),
+            encode_cursor(2, [None, 3]),
+            encode_cursor(2, ['2020-01-01', 3, 4]),
+        ]
+        for token in tokens:
+            with self.subTest(token=token):
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(token, fields)
+                for name in ('after', 'before'):
+                    page = self.get_page(urlencode({name: token}))
+                    self.assertEqual(list(page), self.posts[:10])
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:search') + '?q=Пост',
+            reverse('api:index'),
+            reverse('api:search') + '?q=Пост',
+        )
+        for url in urls:
+            for token in tokens:
+                with self.subTest(url=url, token=token):
+                    separator = '&' if '?' in url else '?'
+                    response = self.client.get(
+                        f'{url}{separator}after={token}')
+                    self.assertEqual(response.status_code, 200)
+
+    def test_cursor_values_parsed(self):
+        fields = CursorPaginator(Post.objects.all(), 10).key_fields
+        post = self.posts[0]
+        number, key = decode_cursor(
+            encode_cursor(3, [post.created, post.id]), fields)
+        self.assertEqual((number, key), (3, [post.created, post.id]))
+
+    def test_other_params_kept(self):
+        """Links keep other GET params."""
+        page = self.get_page('q=text')
+        self.assertIn('q=text', page.next_query)
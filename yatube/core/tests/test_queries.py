@@ -0,0 +1,64 @@
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.queries import (clear_query_stats, get_query_stats, get_views,
+                          record_queries, register_view)
+from posts.models import Post
+from posts.views import IndexListView
+
+
+@override_settings(QUERY_STATS=True)
+class TestQueryBudgetMiddleware(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_recorder_counts_repeated_queries(self):
+        with record_queries() as recorder:
+            for number in range(3):
+                Post.objects.filter(pk=number).exists()
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.repeated, 2)
+
+    def test_over_budget_logged(self):
+        """Request over budget of view is logged and counted."""
+        with mock.patch.object(IndexListView, 'query_budget', 0):
+            with self.assertLogs('core.queries', 'WARNING') as logs:
+                self.client.get(reverse('posts:index'))
+        self.assertIn('posts:index', logs.output[0])
+        stats = get_query_stats()['posts:index']
+        self.assertEqual(stats['requests'], 1)
+        self.assertEqual(stats['over_budget'], 1)
+        self.assertGreater(stats['queries'], 0)
+
+    def test_query_stats_command(self):
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        out = StringIO()
+        call_command('query_stats', '--clear', stdout=out)
+        self.assertIn('posts:index: 2 requests', out.getvalue())
+        self.assertEqual(get_query_stats(), {})
+
+    def test_parallel_views_registered(self):
+        """Views seen by parallel requests are all kept, each once."""
+        names = [f'view{number}' for number in range(8)]
+        threads = [
+            threading.Thread(target=register_view, args=[name])
+            for name in names * 2
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(get_views(), names)
+        self.assertEqual(cache.get('queries:views'), len(names))
+        clear_query_stats()
+        self.assertEqual(get_views(), [])
+        register_view('view0')
+        self.assertEqual(get_views(), ['view0'])
@@ -0,0 +1,79 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from core.jobs import run_pending_jobs
+from core.thumbnails import get_ready_thumbnail
+from posts.models import Post
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+User = get_user_model()
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class TestThumbnails(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_placeholder_until_ready(self):
+        """Page shows placeholder and never makes thumbnail itself."""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        response = self.client.get(url)
+        self.assertContains(response, 'image-placeholder')
+        self.assertIsNone(
+            get_ready_thumbnail(self.post.image, '960x339', crop='center'))
+
+        run_pending_jobs()
+        thumbnail = get_ready_thumbnail(
+            self.post.image, '960x339', crop='center')
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(url)
+        self.assertNotContains(response, 'image-placeholder')
+        self.assertContains(response, thumbnail.url)
+
+    def test_ready_thumbnails_drop_cached_pages(self):
+        """Pages cached with placeholder are dropped when image is ready."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        run_pending_jobs()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertNotContains(response, 'image-placeholder')
+
+    def test_ready_thumbnails_bump_post_version(self):
+        """Cached fragments of post are dropped when image is ready."""
+        version = Post.objects.get(pk=self.post.pk).version
+        run_pending_jobs()
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).version, version + 1)
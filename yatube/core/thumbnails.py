@@ -0,0 +1,93 @@
+"""
+Thumbnails generated in background right after upload.
+
+Geometries of every image field are listed in settings.THUMBNAIL_GEOMETRIES.
+Templates only read ready thumbnails from sorl key value store and show
+placeholder until run_jobs worker has made them, so image is never
+resized while page is rendered.
+"""
+import logging
+
+from django.apps import apps
+from django.conf import settings
+from django.dispatch import Signal
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from .jobs import task
+
+logger = logging.getLogger(__name__)
+
+# Sent by worker when all thumbnails of instance field are ready.
+thumbnails_ready = Signal(providing_args=['instance_id', 'field_name'])
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Sorl backend which can look up thumbnail without creating it."""
+    def get_options(self, source, options):
+        """Options completed by defaults, as sorl names thumbnail by them."""
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def get_ready_thumbnail(self, file_, geometry_string, **options):
+        """Thumbnail from key value store, None if it isn't made yet."""
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self.get_options(source, options))
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+backend = PregeneratedThumbnailBackend()
+
+
+def get_geometries(model, field_name):
+    label = f'{model._meta.label}.{field_name}'
+    return settings.THUMBNAIL_GEOMETRIES.get(label, ())
+
+
+def get_ready_thumbnail(file_, geometry_string, **options):
+    if not file_:
+        return None
+    try:
+        return backend.get_ready_thumbnail(
+            file_, geometry_string, **options)
+    except Exception:
+        logger.exception('Thumbnail lookup failed for %s', file_)
+        return None
+
+
+@task()
+def generate_thumbnails(model_label, instance_id, field_name, file_name):
+    """Make every thumbnail of image and report that they are ready."""
+    model = apps.get_model(model_label)
+    created = False
+    for geometry, options in get_geometries(model, field_name):
+        if backend.get_ready_thumbnail(file_name, geometry, **options):
+            continue
+        backend.get_thumbnail(file_name, geometry, **options)
+        created = True
+    if created:
+        thumbnails_ready.send(
+            sender=model, instance_id=instance_id, field_name=field_name)
+
+
+def schedule_thumbnails(instance, field_name):
+    """Queue thumbnails of image field for worker, once for every file."""
+    file_ = getattr(instance, field_name)
+    if not file_ or not get_geometries(type(instance), field_name):
+        return
+    generate_thumbnails.delay(
+        instance._meta.label, instance.pk, field_name, file_.name,
+        key=f'thumbnails:{instance._meta.label}:{file_.name}',
+    )
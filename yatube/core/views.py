@@ -1,7 +1,16 @@
+import hashlib
+
+from django.core.cache import cache
 from django.shortcuts import render
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.functional import cached_property
 from django.views.generic import RedirectView
 from django.urls import reverse_lazy
 
+from .cache import (cache_page_response, count_page_cache,
+                    get_generations, get_page_cache_key)
+from .paginator import CursorPaginator
+
 
 def bad_request(request, exception):
     return render(request, 'core/400.html', status=400)
@@ -30,3 +39,115 @@ class LastPageRedirectView(RedirectView):
     def get_redirect_url(self, *args, **kwargs):
         return self.request.META.get('HTTP_REFERER') or reverse_lazy(
             'posts:index')
+
+
+class CursorPaginationMixin:
+    """Paginate ListView by cursor tokens instead of page numbers."""
+    paginator_class = CursorPaginator
+    cursor_ordering = ('-created', '-id')
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return self.paginator_class(
+            queryset,
+            per_page,
+            ordering=self.cursor_ordering,
+            params=self.request.GET,
+            count=self.get_object_count,
+            **kwargs,
+        )
+
+    def get_object_count(self):
+        """Number of objects from counter, None if it is not known."""
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = self.get_paginator(queryset, page_size)
+        page = paginator.get_page(self.request.GET)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class AnonymousPageCacheMixin:
+    """
+    Cache whole page for anonymous visitors until its content changes.
+    Page is cached by generations from get_cache_generations(), which are
+    bumped on writes, pages without generations are not cached.
+    Authenticated users get the personal page.
+    """
+    cache_generations = None
+
+    def get_cache_generations(self):
+        """Names of generations of page, None if page is not cached."""
+        return self.cache_generations
+
+    @cached_property
+    def page_generations(self):
+        names = self.get_cache_generations()
+        if names is None:
+            return None
+        return get_generations(*names)
+
+    def dispatch(self, request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+                or self.page_generations is None):
+            return super().dispatch(request, *args, **kwargs)
+        key = get_page_cache_key(request, self.page_generations)
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+        response = cache.get(key)
+        if response is not None:
+            count_page_cache(hit=True)
+            response['X-Page-Cache'] = 'HIT'
+            return response
+        count_page_cache(hit=False)
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        response['X-Page-Cache'] = 'MISS'
+        return cache_page_response(key, response)
+
+
+class ConditionalGetMixin:
+    """
+    Answer repeated GET by 304 Not Modified before page is built.
+    ETag is made of get_etag_parts(), which must change with everything
+    shown on page, and of user and CSRF cookie, as page shows state of
+    user and has forms. By default parts are generations of page cache
+    of AnonymousPageCacheMixin.
+    """
+    def get_etag_parts(self):
+        return self.page_generations
+
+    def get_etag(self):
+        """Quoted ETag of page, None if page has no validator."""
+        parts = self.get_etag_parts()
+        if parts is None:
+            return None
+        parts = (
+            *parts,
+            self.request.user.pk,
+            self.request.META.get('CSRF_COOKIE'),
+        )
+        digest = hashlib.md5(repr(parts).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def not_modified(self):
+        """Called instead of building page which client already has."""
+
+    def dispatch(self, request, *args, **kwargs):
+        etag = None
+        if request.method in ('GET', 'HEAD'):
+            etag = self.get_etag()
+        if etag is None:
+            return super().dispatch(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            self.not_modified()
+        else:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response['ETag'] = etag
+        # Pages are personal, browser checks them on every visit.
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
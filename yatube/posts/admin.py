@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Group, Post
+from .search import build_match, match_posts_where
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -11,6 +12,14 @@ class PostAdmin(admin.ModelAdmin):
     list_editable = ('group',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search by full-text index instead of LIKE over all posts."""
+        match = build_match(search_term)
+        if match is None:
+            return queryset, False
+        where, params = match_posts_where(match)
+        return queryset.extra(where=[where], params=params), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
@@ -0,0 +1,342 @@
+"""
+Latency benchmark of pages with realistic amount of data.
+
+seed() fills empty database with users, groups, posts, comments, likes,
+follows and views by bulk inserts, with ids set in advance and
+denormalized fields filled at once, so no receivers run. measure()
+requests every URL of posts, account and api apps and reports latency
+percentiles and queries per request, explain_requests() reports plans of
+their statements which scan tables or sort rows. See benchmark and
+explain_views commands.
+"""
+import json
+import os
+import random
+import shutil
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from account.models import Profile
+from account.urls import urlpatterns as account_urls
+from api.urls import urlpatterns as api_urls
+from core.explain import check_request
+from core.queries import record_queries
+from .models import (VIEW_LAST_COMMENTS, Comment, FeedItem, Follow, Group,
+                     Post)
+from .importer import bulk_insert
+from .search import index_posts
+from .urls import urlpatterns as posts_urls
+
+User = get_user_model()
+
+# Posts inserted in one transaction.
+BATCH_SIZE = 2000
+POSTS_PER_USER = 100
+GROUPS = 20
+FOLLOWS_PER_USER = 20
+# Numbers of likes and comments of post are picked from these.
+LIKES = (0, 0, 1, 2, 3, 5, 8)
+COMMENTS = (0, 0, 1, 1, 2, 4)
+MAX_VIEWS = 5000
+HISTORY = timedelta(days=730)
+WORDS = (
+    'кот', 'собака', 'город', 'музыка', 'книга', 'лето', 'зима', 'море',
+    'работа', 'друзья', 'кофе', 'погода', 'фильм', 'дорога', 'утро', 'вечер',
+    'новый', 'старый', 'большой', 'тихий', 'читать', 'писать', 'гулять',
+    'смотреть', 'думать', 'python', 'django', 'sqlite', 'yatube', 'code',
+)
+# Benchmark user, follows other users and owns posts for edit pages.
+READER = 'user1'
+SEARCH_QUERY = 'музыка'
+COMMENT_TEXT = 'Комментарий бенчмарка'
+PERCENTILES = (50, 95, 99)
+
+
+def make_text(rng):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(5, 40)))
+
+
+def seed_users(rng, users):
+    User.objects.bulk_create(
+        (
+            User(id=user_id, username=f'user{user_id}', password='!')
+            for user_id in range(1, users + 1)
+        ),
+    )
+    follows = set()
+    for user_id in range(1, users + 1):
+        authors = rng.sample(
+            range(1, users + 1), min(FOLLOWS_PER_USER + 1, users))
+        follows.update(
+            (user_id, author_id) for author_id in authors
+            if author_id != user_id
+        )
+    Follow.objects.bulk_create(
+        Follow(user_id=user, author_id=author) for user, author in follows)
+    followers = Counter(author for _, author in follows)
+    Profile.objects.bulk_create(
+        (
+            Profile(user_id=user_id, followers_count=followers[user_id])
+            for user_id in range(1, users + 1)
+        ),
+    )
+    Group.objects.bulk_create(
+        Group(
+            id=number,
+            title=f'Группа {number}',
+            slug=f'group-{number}',
+            description=make_text(rng),
+        )
+        for number in range(1, GROUPS + 1)
+    )
+
+
+def make_comments(rng, post, users, next_id):
+    comments = [
+        Comment(
+            id=next_id + number,
+            post_id=post.id,
+            author_id=rng.randint(1, users),
+            text=make_text(rng),
+            created=post.created + timedelta(minutes=number + 1),
+        )
+        for number in range(rng.choice(COMMENTS))
+    ]
+    post.comment_count = len(comments)
+    post.last_comments = json.dumps(
+        [
+            {
+                'id': comment.id,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+                'username': f'user{comment.author_id}',
+                'full_name': '',
+            }
+            for comment in comments[-VIEW_LAST_COMMENTS:]
+        ],
+        ensure_ascii=False,
+    ) if comments else ''
+    return comments
+
+
+def seed_posts(rng, size, users):
+    """Insert posts with comments, likes and search documents."""
+    likes_model = Post.user_likes.through
+    start = timezone.now() - HISTORY
+    step = HISTORY / size
+    comment_id = 1
+    for first_id in range(1, size + 1, BATCH_SIZE):
+        posts, comments, likes = [], [], []
+        for post_id in range(first_id, min(first_id + BATCH_SIZE, size + 1)):
+            liked_by = rng.sample(range(1, users + 1), rng.choice(LIKES))
+            group_id = rng.randint(1, GROUPS) if rng.random() < 0.7 else None
+            post = Post(
+                id=post_id,
+                # The last post is of reader, for its edit page.
+                author_id=1 if post_id == size else rng.randint(1, users),
+                group_id=group_id,
+                text=make_text(rng),
+                likes=len(liked_by),
+                view_count=rng.randint(0, MAX_VIEWS),
+            )
+            post.created = start + step * post_id
+            post_comments = make_comments(rng, post, users, comment_id)
+            comment_id += len(post_comments)
+            posts.append(post)
+            comments.extend(post_comments)
+            likes.extend(
+                likes_model(post_id=post_id, user_id=user_id)
+                for user_id in liked_by
+            )
+        with transaction.atomic():
+            insert_posts(posts, comments)
+            likes_model.objects.bulk_create(likes)
+            index_seeded_posts(posts, comments)
+
+
+def insert_posts(posts, comments):
+    """Insert posts and comments keeping their dates of creation."""
+    bulk_insert(Post, posts)
+    bulk_insert(Comment, comments)
+
+
+def index_seeded_posts(posts, comments):
+    texts = {}
+    for comment in comments:
+        texts.setdefault(comment.post_id, []).append(comment.text)
+    index_posts(
+        (post.id, post.text, texts.get(post.id, ())) for post in posts)
+
+
+def seed(size, seed_value=0):
+    """Fill empty database with size posts and related data."""
+    rng = random.Random(seed_value)
+    users = max(size // POSTS_PER_USER, FOLLOWS_PER_USER + 1)
+    seed_users(rng, users)
+    seed_posts(rng, size, users)
+    reader = User.objects.get(username=READER)
+    for author_id in Follow.objects.filter(user=reader).values_list(
+            'author_id', flat=True):
+        FeedItem.objects.backfill(reader.id, author_id)
+
+
+def use_database(name):
+    connection.close()
+    connection.settings_dict['NAME'] = name
+
+
+def use_seeded_copy(data_dir, size, write):
+    """
+    Switch to copy of database seeded with size posts, so requests
+    changing data don't affect the next runs. Seeded database is kept in
+    data_dir and reused. Returns CACHES setting with empty cache.
+    """
+    seeded = os.path.join(data_dir, f'seed_{size}.sqlite3')
+    copy = os.path.join(data_dir, f'run_{size}.sqlite3')
+    cache_location = os.path.join(data_dir, f'cache_{size}.sqlite3')
+    if not os.path.exists(seeded):
+        write(f'Seeding {size} posts...')
+        if os.path.exists(seeded + '.tmp'):
+            os.remove(seeded + '.tmp')
+        use_database(seeded + '.tmp')
+        call_command('migrate', verbosity=0, interactive=False)
+        with connection.cursor() as cursor:
+            # Unfinished file is seeded again anyway.
+            cursor.execute('PRAGMA synchronous = OFF')
+        seed(size)
+        connection.close()
+        os.replace(seeded + '.tmp', seeded)
+    shutil.copyfile(seeded, copy)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(cache_location + suffix):
+            os.remove(cache_location + suffix)
+    use_database(copy)
+    # Database seeded before new migrations gets their indexes.
+    call_command('migrate', verbosity=0, interactive=False)
+    return {'default': {
+        **settings.CACHES['default'], 'LOCATION': cache_location}}
+
+
+def get_url_kwargs(reader):
+    post = Post.objects.filter(author=reader).order_by('-id').first()
+    author = User.objects.filter(
+        following__user=reader).order_by('id').first()
+    return {
+        'slug': Group.objects.order_by('id').first().slug,
+        'username': author.username,
+        'post_id': post.id,
+    }
+
+
+def get_requests(reader):
+    """Method, name, URL and data of request to every page."""
+    kwargs = get_url_kwargs(reader)
+    requests = []
+    for namespace, patterns in (('posts', posts_urls),
+                                ('account', account_urls),
+                                ('api', api_urls)):
+        for pattern in patterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            name = f'{namespace}:{pattern.name}'
+            url = reverse(name, kwargs={
+                key: kwargs[key] for key in pattern.pattern.converters})
+            if name in ('posts:search', 'api:search'):
+                url += f'?q={SEARCH_QUERY}'
+            if name == 'posts:add_comment':
+                requests.append(('post', name, url, {'text': COMMENT_TEXT}))
+            else:
+                requests.append(('get', name, url, None))
+    return requests
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, -(-len(values) * percent // 100) - 1)
+    return values[index]
+
+
+def measure_request(client, method, url, data, requests, warmup):
+    latencies, queries = [], []
+    for number in range(warmup + requests):
+        with record_queries() as recorder:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            duration = time.perf_counter() - start
+        if number >= warmup:
+            latencies.append(duration * 1000)
+            queries.append(recorder.count)
+    latencies.sort()
+    result = {
+        f'p{percent}_ms': round(percentile(latencies, percent), 3)
+        for percent in PERCENTILES
+    }
+    result['queries'] = sorted(queries)[len(queries) // 2]
+    result['status'] = response.status_code
+    return result
+
+
+def measure(requests=50, warmup=2, guest=False):
+    """Latency and queries of every page, by client and URL name."""
+    reader = User.objects.get(username=READER)
+    clients = {'reader': Client()}
+    clients['reader'].force_login(reader)
+    if guest:
+        clients['guest'] = Client()
+    results = {}
+    for client_name, client in clients.items():
+        results[client_name] = {
+            name: measure_request(client, method, url, data, requests, warmup)
+            for method, name, url, data in get_requests(reader)
+        }
+    return results
+
+
+def explain_requests():
+    """
+    Statements of every page which scan tables or sort rows, by URL
+    name, as lists of (sql, problems, recommended index).
+    """
+    reader = User.objects.get(username=READER)
+    client = Client()
+    client.force_login(reader)
+    results = {}
+    for method, name, url, data in get_requests(reader):
+        results[name] = check_request(
+            lambda: getattr(client, method)(url, data))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Lines with changes of p95 and queries against baseline results.
+    Pages slower by threshold percent or with more queries are marked.
+    """
+    lines = []
+    for size, clients in results.items():
+        for client_name, pages in clients.items():
+            old_pages = baseline.get(size, {}).get(client_name, {})
+            for name, numbers in pages.items():
+                old = old_pages.get(name)
+                if old is None:
+                    continue
+                change = (numbers['p95_ms'] / old['p95_ms'] - 1) * 100 if (
+                    old['p95_ms']) else 0
+                regression = (
+                    change > threshold or numbers['queries'] > old['queries'])
+                lines.append(
+                    f'{"REGRESSION " if regression else ""}'
+                    f'{size} {client_name} {name}: p95 {old["p95_ms"]} -> '
+                    f'{numbers["p95_ms"]} ms ({change:+.0f}%), queries '
+                    f'{old["queries"]} -> {numbers["queries"]}'
+                )
+    return lines
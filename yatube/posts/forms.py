@@ -1,11 +1,14 @@
 from django import forms
 
+from core.images import IngestImagesMixin
 from .models import Comment, Post
 from .validators import ValidateTextFieldMixin
 
 
-class PostForm(forms.ModelForm, ValidateTextFieldMixin):
+class PostForm(IngestImagesMixin, forms.ModelForm, ValidateTextFieldMixin):
     """Form for create/edit post."""
+    ingest_fields = ('image',)
+
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
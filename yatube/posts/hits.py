@@ -0,0 +1,107 @@
+"""
+Write-behind counter of post views.
+
+Views are summed up in cache and written to Post.view_count in batches
+by background job, queued when VIEW_COUNT_FLUSH_THRESHOLD views are
+pending or when VIEW_COUNT_FLUSH_INTERVAL seconds have passed since the
+last flush. Every counter is changed only by atomic incr(). Posts with
+pending views are listed in PendingView table by the first view since
+flush, which is found by cache.add() of marker key of post.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from core.jobs import task
+from .models import PendingView, Post
+
+PENDING_KEY = 'views:pending'
+FLUSH_KEY = 'views:flushed'
+QUEUED_KEY = 'views:queued'
+FLUSH_BATCH_SIZE = 500
+
+
+def get_post_key(post_id):
+    return f'views:post:{post_id}'
+
+
+def get_marker_key(post_id):
+    return f'views:listed:{post_id}'
+
+
+def increment(key, delta=1):
+    """Increment counter in cache, create it if missing."""
+    if cache.add(key, delta, timeout=None):
+        return delta
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, timeout=None)
+        return delta
+
+
+def count_view(post_id):
+    """
+    Count view of post.
+    Return views of post counted after Post.view_count was read,
+    including this one.
+    """
+    pending_views = increment(get_post_key(post_id))
+    if cache.add(get_marker_key(post_id), True, timeout=None):
+        PendingView.objects.bulk_create(
+            [PendingView(post_id=post_id)], ignore_conflicts=True)
+    pending = increment(PENDING_KEY)
+    interval = settings.VIEW_COUNT_FLUSH_INTERVAL
+    interval_passed = cache.add(FLUSH_KEY, True, timeout=interval)
+    flush_due = (
+        interval_passed or pending >= settings.VIEW_COUNT_FLUSH_THRESHOLD)
+    if flush_due and cache.add(QUEUED_KEY, True, timeout=interval):
+        flush_views.delay()
+    return pending_views
+
+
+@task()
+def flush_views():
+    """
+    Write buffered views to database, return their number.
+    Listed posts are taken off the list before their counters are read,
+    so post viewed during the flush is listed again. Counters are
+    decreased by flushed value, views counted meanwhile stay for the
+    next flush.
+    """
+    cache.delete(QUEUED_KEY)
+    post_ids = list(PendingView.objects.values_list('post_id', flat=True))
+    total = 0
+    for start in range(0, len(post_ids), FLUSH_BATCH_SIZE):
+        total += flush_posts(post_ids[start:start + FLUSH_BATCH_SIZE])
+    increment(PENDING_KEY, -total)
+    cache.set(FLUSH_KEY, True, timeout=settings.VIEW_COUNT_FLUSH_INTERVAL)
+    return total
+
+
+def flush_posts(post_ids):
+    """
+    Write views of posts, posts with the same number of new views are
+    updated by one query. If it fails, posts stay listed.
+    """
+    keys = {get_post_key(post_id): post_id for post_id in post_ids}
+    batches = defaultdict(list)
+    with transaction.atomic():
+        PendingView.objects.filter(post_id__in=post_ids).delete()
+        cache.delete_many([get_marker_key(post_id) for post_id in post_ids])
+        views = cache.get_many(keys)
+        for key, count in views.items():
+            if count:
+                batches[count].append(keys[key])
+        for count, batch in batches.items():
+            Post.objects.filter(pk__in=batch).update(
+                view_count=F('view_count') + count)
+    total = 0
+    for key, count in views.items():
+        if count:
+            increment(key, -count)
+            total += count
+    return total
@@ -0,0 +1,436 @@
+"""
+Bulk import of users, posts, comments, likes and follows.
+
+Records are read one by one from NDJSON or CSV in the format of account
+export and inserted by bulk_create, a batch per transaction. Authors,
+groups and posts are found through in-memory maps of usernames, slugs
+and legacy ids, ids of new posts and comments are set in advance from
+ranges reserved for every batch, so nothing is fetched back, site may
+write at the same time and no receivers run. Denormalized fields, feeds,
+search index and caches are rebuilt once by finish(), or by rebuild()
+for batches written before import failed.
+"""
+import csv
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from account.models import Profile
+from core.cache import bump_generation
+from core.counters import drop_counts
+from .models import (FOLLOWEES_KEY, PULL_AUTHORS_KEY, VIEW_LAST_COMMENTS,
+                     Comment, Follow, Group, Post, get_pull_authors)
+from .search import index_comments, index_posts
+
+User = get_user_model()
+
+IMPORT_BATCH_SIZE = 5000
+# Ids in one IN (...) lookup, below SQLite limit of variables.
+LOOKUP_SIZE = 500
+TYPES = ('user', 'post', 'comment', 'like', 'follow')
+INTEGER_FIELDS = ('id', 'post')
+USER_FIELDS = ('first_name', 'last_name', 'email')
+
+
+def read_ndjson(lines):
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_csv(lines):
+    """Rows of CSV export, empty cells are missing values."""
+    for row in csv.DictReader(lines):
+        record = {key: value for key, value in row.items() if value != ''}
+        for field in INTEGER_FIELDS:
+            if field in record:
+                record[field] = int(record[field])
+        yield record
+
+
+def read_records(lines, data_format='ndjson'):
+    if data_format == 'csv':
+        return read_csv(lines)
+    return read_ndjson(lines)
+
+
+def chunked(values, size=LOOKUP_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+@contextmanager
+def keep_created(model):
+    """
+    Turn off auto_now_add of created of ModelWithDate, so given dates
+    are inserted. Field is shared by the process, which only imports.
+    """
+    field = model._meta.get_field('created')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+def bulk_insert(model, objects):
+    """bulk_create keeping given dates of creation of ModelWithDate."""
+    with keep_created(model):
+        model.objects.bulk_create(objects)
+
+
+def reserve_ids(model, count):
+    """
+    First of count ids of model which no other insert can take.
+    SQLite gives AUTOINCREMENT ids above the sequence of table, so it is
+    moved past the range, under write lock of the transaction.
+    """
+    table = model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'UPDATE sqlite_sequence SET seq = seq + %s WHERE name = %s',
+            [count, table],
+        )
+        if not cursor.rowcount:
+            # Nothing was ever inserted to table.
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)',
+                [table, count],
+            )
+        cursor.execute(
+            'SELECT seq FROM sqlite_sequence WHERE name = %s', [table])
+        return cursor.fetchone()[0] - count + 1
+
+
+def parse_created(value):
+    created = parse_datetime(value) if value else None
+    if created is None:
+        return timezone.now()
+    if timezone.is_naive(created):
+        return timezone.make_aware(created)
+    return created
+
+
+class Importer:
+    """
+    Collect records by add() and write them by batches.
+    Records without author are imported as made by default author,
+    so export of one account can be imported as it is.
+    """
+    def __init__(self, default_author=None, batch_size=IMPORT_BATCH_SIZE):
+        self.default_author = default_author
+        self.batch_size = batch_size
+        self.users = {}
+        self.groups = dict(Group.objects.values_list('slug', 'id'))
+        self.posts = {}
+        self.pending = {name: [] for name in TYPES}
+        self.counts = Counter()
+        self.skipped = Counter()
+        self.commented_posts = set()
+        self.liked_posts = set()
+        self.posting_authors = set()
+        self.posting_groups = set()
+        self.follows = set()
+        self.started = time.perf_counter()
+
+    @property
+    def rows(self):
+        return sum(self.counts.values())
+
+    def rows_per_second(self):
+        return self.rows / max(time.perf_counter() - self.started, 1e-9)
+
+    def add(self, record):
+        record_type = record.get('type')
+        if record_type not in self.pending:
+            self.skipped['unknown'] += 1
+            return
+        self.pending[record_type].append(record)
+        if len(self.pending[record_type]) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write pending records, posts before records pointing to them."""
+        with transaction.atomic():
+            for record_type in TYPES:
+                records = self.pending[record_type]
+                if records:
+                    self.pending[record_type] = []
+                    getattr(self, f'insert_{record_type}s')(records)
+
+    def get_author(self, record, field='author'):
+        return record.get(field) or self.default_author
+
+    def resolve_users(self, usernames, records=()):
+        """
+        Put ids of users to map, missing users are created without
+        password, with profile fields of user records.
+        """
+        missing = {
+            username for username in usernames
+            if username and username not in self.users
+        }
+        for chunk in chunked(missing):
+            self.users.update(User.objects.filter(
+                username__in=chunk).values_list('username', 'id'))
+        missing -= set(self.users)
+        if not missing:
+            return
+        data = {record['author']: record for record in records}
+        User.objects.bulk_create(
+            User(
+                username=username,
+                password=make_password(None),
+                **{
+                    field: data.get(username, {}).get(field) or ''
+                    for field in USER_FIELDS
+                },
+            )
+            for username in missing
+        )
+        for chunk in chunked(missing):
+            self.users.update(User.objects.filter(
+                username__in=chunk).values_list('username', 'id'))
+        profiles = []
+        for username in missing:
+            record = data.get(username, {})
+            profiles.append(Profile(
+                user_id=self.users[username],
+                bio=record.get('bio') or '',
+                location=record.get('location') or '',
+                birth_date=parse_date(record.get('birth_date') or ''),
+            ))
+        Profile.objects.bulk_create(profiles)
+        self.counts['user'] += len(missing)
+
+    def resolve_groups(self, slugs):
+        missing = {slug for slug in slugs if slug and slug not in self.groups}
+        if missing:
+            Group.objects.bulk_create(
+                Group(title=slug, slug=slug, description='')
+                for slug in missing
+            )
+            for chunk in chunked(missing):
+                self.groups.update(Group.objects.filter(
+                    slug__in=chunk).values_list('slug', 'id'))
+
+    def insert_users(self, records):
+        records = [record for record in records if record.get('author')]
+        self.resolve_users(
+            [record['author'] for record in records], records)
+
+    def insert_posts(self, records):
+        self.resolve_users(self.get_author(record) for record in records)
+        self.resolve_groups(record.get('group') for record in records)
+        next_id = reserve_ids(Post, len(records))
+        posts = []
+        for record in records:
+            author_id = self.users.get(self.get_author(record))
+            if author_id is None:
+                self.skipped['post'] += 1
+                continue
+            post = Post(
+                id=next_id,
+                author_id=author_id,
+                group_id=self.groups.get(record.get('group')),
+                text=record.get('text') or '',
+                image=record.get('image') or '',
+            )
+            post.created = parse_created(record.get('created'))
+            next_id += 1
+            if record.get('id') is not None:
+                self.posts[record['id']] = post.id
+            posts.append(post)
+            self.posting_authors.add(author_id)
+            self.posting_groups.add(post.group_id)
+        bulk_insert(Post, posts)
+        index_posts((post.id, post.text, ()) for post in posts)
+        self.counts['post'] += len(posts)
+
+    def insert_comments(self, records):
+        self.resolve_users(self.get_author(record) for record in records)
+        next_id = reserve_ids(Comment, len(records))
+        comments = []
+        for record in records:
+            author_id = self.users.get(self.get_author(record))
+            post_id = self.posts.get(record.get('post'))
+            if author_id is None or post_id is None:
+                self.skipped['comment'] += 1
+                continue
+            comment = Comment(
+                id=next_id,
+                post_id=post_id,
+                author_id=author_id,
+                text=record.get('text') or '',
+            )
+            comment.created = parse_created(record.get('created'))
+            next_id += 1
+            comments.append(comment)
+            self.commented_posts.add(post_id)
+        bulk_insert(Comment, comments)
+        index_comments((comment.post_id, comment.text) for comment in comments)
+        self.counts['comment'] += len(comments)
+
+    def insert_likes(self, records):
+        likes_model = Post.user_likes.through
+        self.resolve_users(
+            self.get_author(record, 'user') for record in records)
+        likes = []
+        for record in records:
+            user_id = self.users.get(self.get_author(record, 'user'))
+            post_id = self.posts.get(record.get('post'))
+            if user_id is None or post_id is None:
+                self.skipped['like'] += 1
+                continue
+            likes.append(likes_model(post_id=post_id, user_id=user_id))
+            self.liked_posts.add(post_id)
+        likes_model.objects.bulk_create(likes, ignore_conflicts=True)
+        self.counts['like'] += len(likes)
+
+    def insert_follows(self, records):
+        self.resolve_users(
+            name for record in records
+            for name in (self.get_author(record, 'user'), record.get('author'))
+        )
+        follows = set()
+        for record in records:
+            user_id = self.users.get(self.get_author(record, 'user'))
+            author_id = self.users.get(record.get('author'))
+            if None in (user_id, author_id) or user_id == author_id:
+                self.skipped['follow'] += 1
+                continue
+            follows.add((user_id, author_id))
+        Follow.objects.bulk_create(
+            (Follow(user_id=user, author_id=author)
+             for user, author in follows),
+            ignore_conflicts=True,
+        )
+        self.follows |= follows
+        self.counts['follow'] += len(follows)
+
+    def finish(self):
+        """
+        Write the rest and rebuild what receivers would maintain, written
+        batches are rebuilt even if the rest fails.
+        """
+        try:
+            self.flush()
+        finally:
+            self.rebuild()
+
+    def rebuild(self):
+        """Rebuild what receivers would maintain for written batches."""
+        with transaction.atomic():
+            self.rebuild_comments()
+            self.rebuild_likes()
+            self.rebuild_followers()
+        cache.delete(PULL_AUTHORS_KEY)
+        self.rebuild_feeds()
+        self.drop_caches()
+
+    def rebuild_comments(self):
+        """Comment counters and snapshots of commented posts."""
+        for chunk in chunked(self.commented_posts):
+            comments = Comment.objects.filter(post_id__in=chunk).order_by(
+                'post_id', '-created', '-id').values_list(
+                'post_id', 'id', 'text', 'created', 'author__username',
+                'author__first_name', 'author__last_name')
+            counts, last_comments = Counter(), {}
+            for row in comments.iterator(chunk_size=IMPORT_BATCH_SIZE):
+                post_id = row[0]
+                counts[post_id] += 1
+                if counts[post_id] <= VIEW_LAST_COMMENTS:
+                    last_comments.setdefault(post_id, []).insert(0, {
+                        'id': row[1],
+                        'text': row[2],
+                        'created': row[3].isoformat(),
+                        'username': row[4],
+                        'full_name': f'{row[5]} {row[6]}'.strip(),
+                    })
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'UPDATE posts_post SET comment_count = %s, '
+                    'last_comments = %s, version = version + 1 '
+                    'WHERE id = %s',
+                    [
+                        (count, json.dumps(
+                            last_comments[post_id], ensure_ascii=False),
+                         post_id)
+                        for post_id, count in counts.items()
+                    ],
+                )
+
+    def rebuild_likes(self):
+        likes_model = Post.user_likes.through
+        for chunk in chunked(self.liked_posts):
+            counts = likes_model.objects.filter(post_id__in=chunk).values(
+                'post_id').annotate(count=Count('id')).order_by()
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'UPDATE posts_post SET likes = %s, '
+                    'version = version + 1 WHERE id = %s',
+                    [(row['count'], row['post_id']) for row in counts],
+                )
+
+    def rebuild_followers(self):
+        authors = {author_id for _, author_id in self.follows}
+        for chunk in chunked(authors):
+            counts = Follow.objects.filter(author_id__in=chunk).values(
+                'author_id').annotate(count=Count('id')).order_by()
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    'UPDATE account_profile SET followers_count = %s '
+                    'WHERE user_id = %s',
+                    [(row['count'], row['author_id']) for row in counts],
+                )
+
+    def rebuild_feeds(self):
+        """
+        Deliver posts of authors with new posts or followers to feeds of
+        their followers, by one statement for a chunk of authors.
+        Items which are in feeds already are kept.
+        """
+        authors = self.posting_authors | {
+            author_id for _, author_id in self.follows}
+        authors -= get_pull_authors()
+        with transaction.atomic(), connection.cursor() as cursor:
+            for chunk in chunked(authors):
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(
+                    'INSERT OR IGNORE INTO posts_feeditem '
+                    '(user_id, post_id, author_id, created) '
+                    'SELECT follow.user_id, post.id, post.author_id, '
+                    'post.created FROM posts_follow follow '
+                    'INNER JOIN posts_post post '
+                    'ON post.author_id = follow.author_id '
+                    f'WHERE follow.author_id IN ({placeholders})',
+                    chunk,
+                )
+
+    def drop_caches(self):
+        authors = self.posting_authors | {
+            author_id for _, author_id in self.follows}
+        groups = {group_id for group_id in self.posting_groups if group_id}
+        drop_counts(
+            'posts',
+            *(f'posts:author:{author_id}' for author_id in authors),
+            *(f'posts:group:{group_id}' for group_id in groups),
+        )
+        cache.delete_many([
+            FOLLOWEES_KEY.format(user_id) for user_id, _ in self.follows])
+        bump_generation(
+            'posts',
+            'profiles',
+            *(f'author:{author_id}' for author_id in authors),
+            *(f'group:{group_id}' for group_id in groups),
+        )
@@ -0,0 +1,99 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts.benchmark import compare, measure, use_seeded_copy
+
+SIZES = (10000, 100000, 1000000)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure latency and queries of every page with 10k, 100k and 1M '
+        'posts, save results as JSON and compare them with baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=SIZES,
+            help='Numbers of posts to measure with.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=50,
+            help='Measured requests to every page.',
+        )
+        parser.add_argument(
+            '--guest', action='store_true',
+            help='Measure pages for guest too.',
+        )
+        parser.add_argument(
+            '--data-dir', default=os.path.join(settings.BASE_DIR, 'benchmark'),
+            help='Directory of seeded databases, they are reused.',
+        )
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='File to save results to.',
+        )
+        parser.add_argument(
+            '--baseline',
+            help='Results of previous run to compare with.',
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=20,
+            help='Slowdown of p95 in percent reported as regression.',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as file:
+                    baseline = json.load(file)['sizes']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'Baseline is not readable: {error}')
+        os.makedirs(options['data_dir'], exist_ok=True)
+        results = {}
+        for size in options['sizes']:
+            results[str(size)] = self.run(size, options)
+        with open(options['output'], 'w') as file:
+            json.dump({
+                'created': timezone.now().isoformat(),
+                'requests': options['requests'],
+                'sizes': results,
+            }, file, indent=2, ensure_ascii=False)
+        self.write_curves(results)
+        if baseline is not None:
+            for line in compare(results, baseline, options['threshold']):
+                style = self.style.ERROR if line.startswith(
+                    'REGRESSION') else self.style.SUCCESS
+                self.stdout.write(style(line))
+
+    def run(self, size, options):
+        caches = use_seeded_copy(
+            options['data_dir'], size, self.stdout.write)
+        # Debug toolbar and query log would be measured too.
+        with override_settings(CACHES=caches, DEBUG=False, INTERNAL_IPS=[],
+                               QUERY_STATS=False):
+            self.stdout.write(f'Measuring {size} posts...')
+            return measure(options['requests'], guest=options['guest'])
+
+    def write_curves(self, results):
+        """p95 and queries of every page by size, to see how they grow."""
+        sizes = list(results)
+        first = results[sizes[0]]
+        for client_name, pages in first.items():
+            self.stdout.write(f'\n{client_name}: p95 ms (queries) by posts')
+            self.stdout.write(
+                'page'.ljust(26) + ''.join(size.rjust(16) for size in sizes))
+            for name in pages:
+                cells = ''
+                for size in sizes:
+                    numbers = results[size][client_name][name]
+                    cells += (
+                        f'{numbers["p95_ms"]:.1f} ({numbers["queries"]})'
+                    ).rjust(16)
+                self.stdout.write(name.ljust(26) + cells)
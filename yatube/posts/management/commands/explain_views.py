@@ -0,0 +1,50 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from posts.benchmark import explain_requests, use_seeded_copy
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN QUERY PLAN on statements of every page with seeded '
+        'data, report full scans and temporary sorts and indexes which '
+        'would avoid them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=10000,
+            help='Number of posts to seed.',
+        )
+        parser.add_argument(
+            '--data-dir', default=os.path.join(settings.BASE_DIR, 'benchmark'),
+            help='Directory of seeded databases, shared with benchmark.',
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['data_dir'], exist_ok=True)
+        caches = use_seeded_copy(
+            options['data_dir'], options['size'], self.stdout.write)
+        with override_settings(CACHES=caches, DEBUG=False, INTERNAL_IPS=[],
+                               QUERY_STATS=False):
+            results = explain_requests()
+        indexes = set()
+        for name, statements in results.items():
+            if not statements:
+                self.stdout.write(self.style.SUCCESS(f'OK {name}'))
+                continue
+            self.stdout.write(self.style.WARNING(f'CHECK {name}'))
+            for sql, problems, index in statements:
+                self.stdout.write(f'  {sql}')
+                for problem in problems:
+                    self.stdout.write(f'    {problem}')
+                if index is not None:
+                    self.stdout.write(f'    index: {index}')
+                    indexes.add(index)
+        if indexes:
+            self.stdout.write('\nRecommended indexes:')
+            for index in sorted(indexes):
+                self.stdout.write(f'  {index}')
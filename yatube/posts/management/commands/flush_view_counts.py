@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from posts.hits import flush_views
+
+
+class Command(BaseCommand):
+    help = 'Write views of posts buffered in cache to database.'
+
+    def handle(self, *args, **options):
+        total = flush_views()
+        self.stdout.write(f'Flushed views: {total}')
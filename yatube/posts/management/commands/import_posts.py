@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import IMPORT_BATCH_SIZE, Importer, read_records
+
+PROGRESS_ROWS = 100000
+
+
+class Command(BaseCommand):
+    help = (
+        'Import users, posts, comments, likes and follows from NDJSON or '
+        'CSV files in format of account export, by batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='+',
+            help='Files to import, "-" reads stdin.',
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'csv'),
+            help='Format of files, by extension if it is not given.',
+        )
+        parser.add_argument(
+            '--author',
+            help='Username of author of records without author.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Records of one type written in one transaction.',
+        )
+
+    def handle(self, *args, **options):
+        importer = Importer(options['author'], options['batch_size'])
+        try:
+            self.read_files(importer, options)
+        except BaseException:
+            # Batches written before the failure stay, make them complete.
+            importer.rebuild()
+            raise
+        started = time.perf_counter()
+        importer.finish()
+        self.stdout.write(
+            f'Rebuilt counters and feeds in '
+            f'{time.perf_counter() - started:.1f} s'
+        )
+        for record_type, count in importer.counts.items():
+            self.stdout.write(f'{record_type}: {count}')
+        for record_type, count in importer.skipped.items():
+            self.stdout.write(self.style.WARNING(
+                f'{record_type}: {count} skipped'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {importer.rows} rows, '
+            f'{importer.rows_per_second():.0f} rows/s'
+        ))
+
+    def read_files(self, importer, options):
+        """Add records of every file to importer."""
+        reported = 0
+        for name in options['files']:
+            data_format = options['format'] or (
+                'csv' if name.endswith('.csv') else 'ndjson')
+            try:
+                file = sys.stdin if name == '-' else open(
+                    name, encoding='utf-8', newline='')
+            except OSError as error:
+                raise CommandError(f'File is not readable: {error}')
+            with file:
+                for record in read_records(file, data_format):
+                    importer.add(record)
+                    if importer.rows - reported >= PROGRESS_ROWS:
+                        reported = importer.rows
+                        self.write_progress(importer)
+            self.stdout.write(f'Read {os.path.basename(name)}')
+
+    def write_progress(self, importer):
+        self.stdout.write(
+            f'{importer.rows} rows, {importer.rows_per_second():.0f} rows/s')
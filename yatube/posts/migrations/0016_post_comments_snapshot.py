@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:04
+
+import json
+
+from django.db import migrations, models
+from django.db.models import Count
+
+VIEW_LAST_COMMENTS = 3
+
+
+def fill_comments_snapshot(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    posts = Post.objects.annotate(total=Count('comments')).filter(total__gt=0)
+    for post in posts.iterator():
+        comments = Comment.objects.filter(post_id=post.id).select_related(
+            'author').order_by('-created', '-id')[:VIEW_LAST_COMMENTS]
+        snapshot = [
+            {
+                'id': comment.id,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+                'username': comment.author.username,
+                'full_name': ' '.join(filter(None, (
+                    comment.author.first_name, comment.author.last_name))),
+            }
+            for comment in comments
+        ][::-1]
+        Post.objects.filter(pk=post.id).update(
+            comment_count=post.total,
+            last_comments=json.dumps(snapshot, ensure_ascii=False),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество комментариев'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='last_comments',
+            field=models.TextField(blank=True, default='', help_text='JSON со снимком последних комментариев', verbose_name='Последние комментарии'),
+        ),
+        migrations.RunPython(fill_comments_snapshot, migrations.RunPython.noop),
+    ]
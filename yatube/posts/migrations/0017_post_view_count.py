@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:07
+
+from django.db import migrations, models
+
+
+def copy_hit_counts(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    HitCount = apps.get_model('hitcount', 'HitCount')
+    Post = apps.get_model('posts', 'Post')
+    content_type = ContentType.objects.filter(
+        app_label='posts', model='post').first()
+    if content_type is None:
+        return
+    hit_counts = HitCount.objects.filter(
+        content_type=content_type).values_list('object_pk', 'hits')
+    for post_id, hits in hit_counts.iterator():
+        Post.objects.filter(pk=post_id).update(view_count=hits)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('hitcount', '0004_auto_20200704_0933'),
+        ('posts', '0016_post_comments_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='view_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Количество просмотров'),
+        ),
+        migrations.RunPython(copy_hit_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 09:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_view_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='version',
+            field=models.PositiveIntegerField(default=1, help_text='Меняется вместе с постом, его комментариями и лайками', verbose_name='Версия'),
+        ),
+    ]
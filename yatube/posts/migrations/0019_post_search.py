@@ -0,0 +1,48 @@
+from django.db import migrations
+
+from posts.search import index_text
+
+INDEX_BATCH_SIZE = 1000
+
+
+def build_search_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    posts = Post.objects.order_by('id').values_list('id', 'text')
+    last_id = 0
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = list(posts.filter(id__gt=last_id)[:INDEX_BATCH_SIZE])
+            if not batch:
+                break
+            last_id = batch[-1][0]
+            comments = {}
+            for post_id, text in Comment.objects.filter(
+                    post_id__in=[post_id for post_id, _ in batch]
+            ).order_by('id').values_list('post_id', 'text'):
+                comments.setdefault(post_id, []).append(index_text(text))
+            cursor.executemany(
+                'INSERT INTO posts_post_search (rowid, text, comments) '
+                'VALUES (%s, %s, %s)',
+                [
+                    (post_id, index_text(text),
+                     ' '.join(comments.get(post_id, ())))
+                    for post_id, text in batch
+                ],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_post_version'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE VIRTUAL TABLE posts_post_search USING fts5("
+            "text, comments, tokenize = 'unicode61 remove_diacritics 2')",
+            'DROP TABLE posts_post_search',
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
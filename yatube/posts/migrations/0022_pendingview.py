@@ -0,0 +1,20 @@
+# Generated by Django 2.2.16 on 2026-10-18 10:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_feed_user_created_post'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingView',
+            fields=[
+                ('post', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='posts.Post', verbose_name='Пост')),
+            ],
+        ),
+    ]
@@ -1,14 +1,41 @@
+import json
+import threading
+from types import SimpleNamespace
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericRelation
-from django.db import models
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils.dateparse import parse_datetime
 from hitcount.models import HitCount
 
+from account.models import Profile
+from core.cache import bump_generation
+from core.counters import change_count, get_count, get_counts
+from core.jobs import task
 from core.models import ModelWithDate
+from core.thumbnails import schedule_thumbnails, thumbnails_ready
+from .search import index_comment, index_post, unindex_post
 
 User = get_user_model()
 STR_VIEW_TEXT_LENGTH = settings.STR_VIEW_TEXT_LENGTH
 VIEW_LAST_COMMENTS = 3
+FEED_BATCH_SIZE = 500
+FOLLOWEES_KEY = 'followees:{}'
+PULL_AUTHORS_KEY = 'pull_authors'
+FOLLOWS_CACHE_TIMEOUT = 60 * 60 * 24
+GROUP_KEY = 'group:slug:{}'
+USER_KEY = 'user:fields:{}'
+# Fields of users kept in cache, password hash and email are never cached.
+USER_CACHE_FIELDS = ('id', 'username', 'first_name', 'last_name')
+RESOLVE_CACHE_TIMEOUT = 60 * 60 * 24
+# Ids of posts being deleted by this thread, see remove_comment_from_post.
+deleting_posts = threading.local()
 
 
 class Group(models.Model):
@@ -33,6 +60,12 @@ class Group(models.Model):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_slug = instance.__dict__.get('slug')
+        return instance
+
 
 class Post(ModelWithDate):
     """Post of user."""
@@ -61,6 +94,25 @@ class Post(ModelWithDate):
         blank=True,
     )
     likes = models.PositiveIntegerField(default=0)
+    view_count = models.PositiveIntegerField(
+        'Количество просмотров',
+        default=0,
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=1,
+        help_text='Меняется вместе с постом, его комментариями и лайками',
+    )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+    )
+    last_comments = models.TextField(
+        'Последние комментарии',
+        blank=True,
+        default='',
+        help_text='JSON со снимком последних комментариев',
+    )
     user_likes = models.ManyToManyField(User)
     hit_count_generic = GenericRelation(
         HitCount,
@@ -70,19 +122,128 @@ class Post(ModelWithDate):
 
     class Meta:
         ordering = ("-created",)
+        indexes = [
+            models.Index(
+                fields=['-created', '-id'],
+                name='post_created_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-created', '-id'],
+                name='post_author_created_idx'
+            ),
+            models.Index(
+                fields=['group', '-created', '-id'],
+                name='post_group_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:STR_VIEW_TEXT_LENGTH]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Bump version of edited post to drop its cached fragments."""
+        edited = not self._state.adding
+        if edited:
+            self.version = F('version') + 1
+        super().save(*args, **kwargs)
+        # Receivers have seen the previous group, next save moves from this.
+        self._loaded_group_id = self.group_id
+        if edited:
+            self.refresh_from_db(fields=['version'])
+
     def get_length(self):
         return len(self.text)
 
     def get_last_comments(self):
-        """Get last comments."""
-        count = self.comments.count()
-        if count <= VIEW_LAST_COMMENTS:
-            return self.comments.all()
-        return self.comments.all()[count - VIEW_LAST_COMMENTS:]
+        """Get last comments from snapshot stored on post."""
+        if not self.last_comments:
+            return []
+        return [
+            CommentSnapshot(data) for data in json.loads(self.last_comments)
+        ]
+
+    def has_more_comments(self):
+        return self.comment_count > VIEW_LAST_COMMENTS
+
+    @classmethod
+    def add_like(cls, post_id, user_id):
+        """
+        Like post by user, second like is ignored.
+        Return True if like was added.
+        """
+        likes = cls.user_likes.through.objects
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    likes.create(post_id=post_id, user_id=user_id)
+            except IntegrityError:
+                return False
+            updated = cls.objects.filter(pk=post_id).update(
+                likes=F('likes') + 1,
+                version=F('version') + 1,
+            )
+            if not updated:
+                raise cls.DoesNotExist
+        bump_post_pages(post_id)
+        return True
+
+    @classmethod
+    def remove_like(cls, post_id, user_id):
+        """Remove like of user, return True if like was removed."""
+        with transaction.atomic():
+            deleted, _ = cls.user_likes.through.objects.filter(
+                post_id=post_id, user_id=user_id).delete()
+            if deleted:
+                cls.objects.filter(pk=post_id, likes__gt=0).update(
+                    likes=F('likes') - 1,
+                    version=F('version') + 1,
+                )
+        if deleted:
+            bump_post_pages(post_id)
+        return bool(deleted)
+
+    @classmethod
+    def refresh_comments(cls, post_id, delta=0):
+        """Update comment counter and snapshot of last comments."""
+        comments = Comment.objects.filter(post_id=post_id).select_related(
+            'author').order_by('-created', '-id')[:VIEW_LAST_COMMENTS]
+        snapshot = json.dumps(
+            [make_comment_snapshot(comment) for comment in comments][::-1],
+            ensure_ascii=False,
+        )
+        cls.objects.filter(pk=post_id).update(
+            comment_count=F('comment_count') + delta,
+            last_comments=snapshot,
+            version=F('version') + 1,
+        )
+
+
+class CommentSnapshot:
+    """Comment restored from snapshot, enough to render it in list."""
+    def __init__(self, data):
+        self.id = data['id']
+        self.text = data['text']
+        self.created = parse_datetime(data['created'])
+        self.author = SimpleNamespace(
+            username=data['username'],
+            get_full_name=data['full_name'],
+        )
+
+
+def make_comment_snapshot(comment):
+    return {
+        'id': comment.id,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'username': comment.author.username,
+        'full_name': comment.author.get_full_name(),
+    }
 
 
 class Comment(ModelWithDate):
@@ -104,6 +265,14 @@ class Comment(ModelWithDate):
         help_text="Текст комментария к посту"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text[:STR_VIEW_TEXT_LENGTH]
 
@@ -129,3 +298,470 @@ class Follow(models.Model):
                 name='unique_user_author'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class FeedItemManager(models.Manager):
+    """Keep materialized follow feeds in sync with posts and follows."""
+    def fan_out(self, post):
+        """Deliver new post to feeds of all followers of its author."""
+        if post.author_id in get_pull_authors():
+            return
+        followers = Follow.objects.filter(
+            author_id=post.author_id).values_list('user_id', flat=True)
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    post_id=post.id,
+                    author_id=post.author_id,
+                    created=post.created,
+                )
+                for user_id in followers.iterator()
+            ),
+            batch_size=FEED_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def backfill(self, user_id, author_id):
+        """Add existing posts of author to feed of user."""
+        posts = Post.objects.filter(
+            author_id=author_id).values_list('id', 'created')
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    post_id=post_id,
+                    author_id=author_id,
+                    created=created,
+                )
+                for post_id, created in posts.iterator()
+            ),
+            batch_size=FEED_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+
+    def backfill_followers(self, author_id):
+        """Rebuild feeds of all followers of author."""
+        followers = Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True)
+        for user_id in followers.iterator():
+            self.backfill(user_id, author_id)
+
+    def prune(self, user_id, author_id):
+        """Remove posts of author from feed of user."""
+        self.filter(user_id=user_id, author_id=author_id).delete()
+
+
+class FeedItem(models.Model):
+    """Post delivered to the follow feed of user."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Пост',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор',
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    objects = FeedItemManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_user_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-created', '-post'],
+                name='feed_user_created_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx'
+            ),
+        ]
+
+
+class PendingView(models.Model):
+    """Post with views buffered in cache, listed once until flush."""
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='+',
+        verbose_name='Пост',
+    )
+
+
+@task()
+def backfill_followers(author_id):
+    """Rebuild feeds of followers of author, who is pushed to them again."""
+    FeedItem.objects.backfill_followers(author_id)
+
+
+def get_pull_authors():
+    """
+    Ids of authors with too many followers for fan-out on write.
+    Posts of such authors are merged into feeds at read time.
+    """
+    authors = cache.get(PULL_AUTHORS_KEY)
+    if authors is None:
+        authors = frozenset(Profile.objects.filter(
+            followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values_list('user_id', flat=True))
+        cache.set(PULL_AUTHORS_KEY, authors, FOLLOWS_CACHE_TIMEOUT)
+    return authors
+
+
+def get_followees(user):
+    """
+    Ids of authors followed by user.
+    Set is kept in cache and updated on follow and unfollow, in request
+    it is read from cache only once.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    followees = getattr(user, '_followees', None)
+    if followees is None:
+        key = FOLLOWEES_KEY.format(user.pk)
+        followees = cache.get(key)
+        if followees is None:
+            followees = frozenset(Follow.objects.filter(
+                user_id=user.pk).values_list('author_id', flat=True))
+            cache.set(key, followees, FOLLOWS_CACHE_TIMEOUT)
+        user._followees = followees
+    return followees
+
+
+def forget_followees(user_id):
+    """
+    Drop cached set of user instead of changing it, so parallel follows
+    can't overwrite each other. It is dropped again after commit, as
+    request reading follows before commit may cache them back.
+    """
+    key = FOLLOWEES_KEY.format(user_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_followers_count(author_id):
+    return Profile.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True).first() or 0
+
+
+def resolve_cached(key, queryset):
+    """Object cached by key or the first of queryset, None if missing."""
+    instance = cache.get(key)
+    if instance is None:
+        instance = queryset.first()
+        if instance is not None:
+            cache.set(key, instance, RESOLVE_CACHE_TIMEOUT)
+    return instance
+
+
+def resolve_group(slug):
+    """Group by slug, cached until group is saved or deleted."""
+    return resolve_cached(
+        GROUP_KEY.format(slug), Group.objects.filter(slug=slug))
+
+
+def resolve_user(username):
+    """
+    User by username, cached until user is saved or deleted. Only public
+    fields are cached, others are deferred.
+    """
+    values = resolve_cached(
+        USER_KEY.format(username),
+        User.objects.filter(username=username).values(*USER_CACHE_FIELDS),
+    )
+    if values is None:
+        return None
+    return User.from_db(
+        User.objects.db, list(values), list(values.values()))
+
+
+def get_posts_count():
+    """Number of all posts, counted once and then kept by writes."""
+    return get_count('posts', lambda: Post.objects.count())
+
+
+def get_group_posts_count(group_id):
+    return get_count(
+        f'posts:group:{group_id}',
+        lambda: Post.objects.filter(group_id=group_id).count(),
+    )
+
+
+def get_author_posts_count(author_id):
+    return get_authors_posts_count([author_id])[author_id]
+
+
+def get_authors_posts_count(author_ids):
+    """Numbers of posts by author ids, missing counters by one query."""
+    def estimate(names):
+        ids = [int(name.rsplit(':', 1)[1]) for name in names]
+        counts = Post.objects.filter(author_id__in=ids).values(
+            'author_id').annotate(count=Count('id')).order_by()
+        return {
+            f'posts:author:{row["author_id"]}': row['count']
+            for row in counts
+        }
+
+    counts = get_counts(
+        [f'posts:author:{author_id}' for author_id in author_ids], estimate)
+    return {
+        author_id: counts[f'posts:author:{author_id}']
+        for author_id in author_ids
+    }
+
+
+def get_feed_posts_count(user):
+    """Number of posts in follow feed, the sum of followed authors."""
+    return sum(get_authors_posts_count(get_followees(user)).values())
+
+
+def count_posts(author_id, group_id, delta):
+    names = ['posts', f'posts:author:{author_id}']
+    if group_id:
+        names.append(f'posts:group:{group_id}')
+    change_count(*names, delta=delta)
+
+
+def bump_pages(author_id=None, group_ids=()):
+    """Drop cached pages of index, author and groups."""
+    names = ['posts']
+    if author_id:
+        names.append(f'author:{author_id}')
+    names.extend(
+        f'group:{group_id}' for group_id in set(group_ids) if group_id)
+    bump_generation(*names)
+
+
+def bump_author_posts(author_id):
+    """Drop cached fragments and pages of posts of author."""
+    Post.objects.filter(author_id=author_id).update(
+        version=F('version') + 1)
+    bump_generation('profiles')
+    bump_pages(author_id)
+
+
+def bump_post_pages(post_id):
+    """Drop cached pages showing post."""
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id').first()
+    if post is not None:
+        bump_pages(post['author_id'], [post['group_id']])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group(sender, instance, raw=False, **kwargs):
+    """Drop group cached by slugs and pages showing its title."""
+    slugs = {instance.slug, getattr(instance, '_loaded_slug', None)}
+    cache.delete_many([GROUP_KEY.format(slug) for slug in slugs if slug])
+    if not raw:
+        bump_generation('profiles')
+        bump_pages(group_ids=[instance.id])
+
+
+@receiver(pre_save, sender=User)
+def forget_old_username(sender, instance, update_fields=None, raw=False,
+                        **kwargs):
+    """Drop user cached by previous username, if it may change."""
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    username = User.objects.filter(pk=instance.pk).values_list(
+        'username', flat=True).first()
+    if username is not None and username != instance.username:
+        cache.delete(USER_KEY.format(username))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, **kwargs):
+    cache.delete(USER_KEY.format(instance.username))
+
+
+@receiver(post_save, sender=User)
+def drop_user_pages(sender, instance, created, update_fields=None,
+                    raw=False, **kwargs):
+    """Pages show names of authors, they are dropped when user changes."""
+    if created or raw or update_fields == frozenset({'last_login'}):
+        return
+    bump_author_posts(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        FeedItem.objects.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        count_posts(instance.author_id, instance.group_id, 1)
+        return
+    if '_loaded_group_id' not in instance.__dict__:
+        return
+    loaded_group_id = instance._loaded_group_id
+    if loaded_group_id != instance.group_id:
+        if loaded_group_id:
+            change_count(f'posts:group:{loaded_group_id}', delta=-1)
+        if instance.group_id:
+            change_count(f'posts:group:{instance.group_id}')
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    count_posts(instance.author_id, instance.group_id, -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def drop_post_pages(sender, instance, **kwargs):
+    group_ids = [
+        instance.group_id,
+        getattr(instance, '_loaded_group_id', None),
+    ]
+    bump_pages(instance.author_id, group_ids)
+
+
+@receiver(post_save, sender=Post)
+def index_post_text(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_post(instance.id, instance.text)
+
+
+@receiver(post_save, sender=Post)
+def make_post_thumbnails(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_thumbnails(instance, 'image')
+
+
+@receiver(thumbnails_ready, sender=Post)
+def show_post_thumbnails(sender, instance_id, **kwargs):
+    Post.objects.filter(pk=instance_id).update(version=F('version') + 1)
+    bump_post_pages(instance_id)
+
+
+@receiver(thumbnails_ready, sender=Profile)
+def show_profile_thumbnails(sender, instance_id, **kwargs):
+    user_id = Profile.objects.filter(pk=instance_id).values_list(
+        'user_id', flat=True).first()
+    if user_id is not None:
+        bump_author_posts(user_id)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    unindex_post(instance.id)
+
+
+@receiver(post_save, sender=Profile)
+def drop_author_pages(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        bump_author_posts(instance.user_id)
+
+
+@receiver(post_save, sender=Comment)
+def add_comment_to_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Post.refresh_comments(instance.post_id, delta=1)
+        bump_post_pages(instance.post_id)
+        index_comment(instance.post_id, instance.text)
+
+
+def get_deleting_posts():
+    if not hasattr(deleting_posts, 'ids'):
+        deleting_posts.ids = set()
+    return deleting_posts.ids
+
+
+@receiver(pre_delete, sender=Post)
+def start_post_delete(sender, instance, **kwargs):
+    get_deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def finish_post_delete(sender, instance, **kwargs):
+    get_deleting_posts().discard(instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_from_post(sender, instance, **kwargs):
+    """
+    Update post of deleted comment, unless comment is deleted with the
+    post: then nothing of post is left to update.
+    """
+    if instance.post_id in get_deleting_posts():
+        return
+    Post.objects.filter(pk=instance.post_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1)
+    Post.refresh_comments(instance.post_id)
+    bump_post_pages(instance.post_id)
+    text = Post.objects.filter(pk=instance.post_id).values_list(
+        'text', flat=True).first()
+    if text is not None:
+        comments = Comment.objects.filter(
+            post_id=instance.post_id).values_list('text', flat=True)
+        index_post(instance.post_id, text, comments)
+
+
+@receiver(post_save, sender=Follow)
+def add_follow_to_feed(sender, instance, created, raw=False, **kwargs):
+    if not created or raw:
+        return
+    forget_followees(instance.user_id)
+    Profile.objects.filter(user_id=instance.author_id).update(
+        followers_count=F('followers_count') + 1)
+    followers_count = get_followers_count(instance.author_id)
+    if followers_count == settings.FEED_FANOUT_LIMIT + 1:
+        # Author has become pull author.
+        cache.delete(PULL_AUTHORS_KEY)
+    if followers_count <= settings.FEED_FANOUT_LIMIT:
+        FeedItem.objects.backfill(instance.user_id, instance.author_id)
+    bump_generation(f'author:{instance.author_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def remove_follow_from_feed(sender, instance, **kwargs):
+    forget_followees(instance.user_id)
+    Profile.objects.filter(
+        user_id=instance.author_id,
+        followers_count__gt=0,
+    ).update(followers_count=F('followers_count') - 1)
+    FeedItem.objects.prune(instance.user_id, instance.author_id)
+    bump_generation(f'author:{instance.author_id}')
+    was_pull_author = (
+        get_followers_count(instance.author_id)
+        == settings.FEED_FANOUT_LIMIT
+    )
+    if was_pull_author:
+        cache.delete(PULL_AUTHORS_KEY)
+        # Every post of author for every follower, too much for request.
+        backfill_followers.delay(instance.author_id)
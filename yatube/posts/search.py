@@ -0,0 +1,219 @@
+"""
+Full-text index of posts.
+
+Posts are indexed in SQLite FTS5 table posts_post_search, rowid of
+document is id of post. Words are stemmed by Russian Snowball stemmer
+before indexing and before search, so "коты" finds "кот" and "котом".
+"""
+import re
+from functools import lru_cache
+
+from django.db import connection
+
+SEARCH_TABLE = 'posts_post_search'
+STEM_CACHE_SIZE = 50000
+# Weights of text and comments columns in bm25 rank.
+SEARCH_RANK = f'bm25({SEARCH_TABLE}, 4.0, 1.0)'
+WORD_RE = re.compile(r'\w+')
+
+VOWELS = 'аеиоуыэюя'
+# Endings of the first group are removed only after "а" or "я".
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+REFLEXIVE = ((), ('ся', 'сь'))
+ADJECTIVE = ((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+VERB = (
+    ('ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+     'ют', 'ны', 'ть', 'ешь', 'нно'),
+    ('ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+     'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+     'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю'),
+)
+NOUN = ((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии', 'и',
+    'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам', 'ом', 'о',
+    'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия', 'ья', 'я',
+))
+SUPERLATIVE = ((), ('ейш', 'ейше'))
+DERIVATIONAL = ('ост', 'ость')
+
+
+def _region(word, start):
+    """Start of region after first non-vowel following a vowel."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _strip(word, groups):
+    """Word without its longest ending from groups, None if no ending."""
+    found = None
+    for group, endings in enumerate(groups):
+        for ending in endings:
+            if word.endswith(ending) and (
+                    found is None or len(ending) > len(found[1])):
+                found = (group, ending)
+    if found is None:
+        return None
+    group, ending = found
+    word = word[:-len(ending)]
+    if group == 0 and not word.endswith(('а', 'я')):
+        return None
+    return word
+
+
+def _remove_ending(word):
+    """Remove ending of gerund, adjective, verb or noun."""
+    result = _strip(word, PERFECTIVE_GERUND)
+    if result is not None:
+        return result
+    reflexive = _strip(word, REFLEXIVE)
+    if reflexive is not None:
+        word = reflexive
+    result = _strip(word, ADJECTIVE)
+    if result is not None:
+        participle = _strip(result, PARTICIPLE)
+        return result if participle is None else participle
+    for endings in (VERB, NOUN):
+        result = _strip(word, endings)
+        if result is not None:
+            return result
+    return word
+
+
+def _tidy_up(word):
+    """Remove superlative ending, double "н" and soft sign."""
+    if word.endswith('нн'):
+        return word[:-1]
+    superlative = _strip(word, SUPERLATIVE)
+    if superlative is not None:
+        if superlative.endswith('нн'):
+            return superlative[:-1]
+        return superlative
+    if word.endswith('ь'):
+        return word[:-1]
+    return word
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    """
+    Stem of Russian word, other words are only lowercased.
+    Stems of frequent words are remembered, as texts repeat them a lot.
+    """
+    word = word.lower().replace('ё', 'е')
+    rv = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word),
+    )
+    r2 = _region(word, _region(word, 0))
+    prefix, word = word[:rv], _remove_ending(word[rv:])
+    if word.endswith('и'):
+        word = word[:-1]
+    for ending in DERIVATIONAL:
+        if word.endswith(ending) and rv + len(word) - len(ending) >= r2:
+            word = word[:-len(ending)]
+            break
+    return prefix + _tidy_up(word)
+
+
+def index_text(text):
+    """Text as it is stored in index: stems separated by spaces."""
+    return ' '.join(stem(word) for word in WORD_RE.findall(text or ''))
+
+
+def build_match(query):
+    """
+    FTS5 query for user input, None if there are no words.
+    All words must be found, the last one may be typed partially.
+    """
+    stems = [index_text(word) for word in WORD_RE.findall(query or '')]
+    if not stems:
+        return None
+    terms = [f'"{word}"' for word in stems]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def index_post(post_id, text, comments=None):
+    """
+    Add or update document of post.
+    Comments are kept when they are not passed.
+    """
+    with connection.cursor() as cursor:
+        if comments is None:
+            cursor.execute(
+                f'UPDATE {SEARCH_TABLE} SET text = %s WHERE rowid = %s',
+                [index_text(text), post_id],
+            )
+            if cursor.rowcount:
+                return
+            comments = ()
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id])
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text, comments) '
+            'VALUES (%s, %s, %s)',
+            [post_id, index_text(text),
+             ' '.join(index_text(comment) for comment in comments)],
+        )
+
+
+def index_comment(post_id, text):
+    """Append new comment to document of post."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {SEARCH_TABLE} SET comments = comments || ' ' || %s "
+            'WHERE rowid = %s',
+            [index_text(text), post_id],
+        )
+
+
+def index_posts(documents):
+    """Add documents of new posts by (post_id, text, comments) tuples."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} (rowid, text, comments) '
+            'VALUES (%s, %s, %s)',
+            [
+                (post_id, index_text(text),
+                 ' '.join(index_text(comment) for comment in comments))
+                for post_id, text, comments in documents
+            ],
+        )
+
+
+def index_comments(comments):
+    """Append new comments by (post_id, text) pairs."""
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {SEARCH_TABLE} SET comments = comments || ' ' || %s "
+            'WHERE rowid = %s',
+            [(index_text(text), post_id) for post_id, text in comments],
+        )
+
+
+def unindex_post(post_id):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s', [post_id])
+
+
+def match_posts_where(match):
+    """WHERE condition and params of posts found by FTS5 query."""
+    return (
+        f'posts_post.id IN (SELECT rowid FROM {SEARCH_TABLE} '
+        f'WHERE {SEARCH_TABLE} MATCH %s)',
+        [match],
+    )
@@ -0,0 +1,11 @@
+from django import template
+
+from posts.models import get_followees
+
+register = template.Library()
+
+
+@register.filter
+def followed_by(author, user):
+    """Whether user follows author, checked by cached set of followees."""
+    return author.pk in get_followees(user)
@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts.benchmark import compare, measure, seed
+from posts.models import Comment, FeedItem, Post
+
+
+class TestBenchmark(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        seed(300)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seeded_counters(self):
+        """Denormalized fields match seeded rows."""
+        post = Post.objects.filter(comment_count__gt=0).first()
+        self.assertEqual(post.comment_count, post.comments.count())
+        self.assertEqual(post.likes, post.user_likes.count())
+        self.assertEqual(
+            post.get_last_comments()[-1].id,
+            post.comments.order_by('created', 'id').last().id,
+        )
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertGreater(Comment.objects.count(), 0)
+        self.assertTrue(FeedItem.objects.filter(user__username='user1'))
+
+    def test_every_page_measured(self):
+        results = measure(requests=2, warmup=0)['reader']
+        self.assertIn('posts:index', results)
+        self.assertIn('account:followers', results)
+        for name, numbers in results.items():
+            with self.subTest(name=name):
+                self.assertLess(numbers['status'], 400)
+                self.assertLessEqual(numbers['p50_ms'], numbers['p99_ms'])
+
+    def test_compare_marks_regressions(self):
+        page = {'p50_ms': 1, 'p95_ms': 10, 'p99_ms': 10, 'queries': 5}
+        baseline = {'300': {'reader': {'posts:index': page}}}
+        slower = {'300': {'reader': {'posts:index': {**page, 'p95_ms': 13}}}}
+        same = {'300': {'reader': {'posts:index': {**page, 'p95_ms': 11}}}}
+        self.assertTrue(compare(slower, baseline, 20)[0].startswith(
+            'REGRESSION'))
+        self.assertFalse(compare(same, baseline, 20)[0].startswith(
+            'REGRESSION'))
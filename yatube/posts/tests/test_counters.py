@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.queries import record_queries
+from posts.models import (Follow, Group, Post, get_author_posts_count,
+                          get_feed_posts_count, get_group_posts_count,
+                          get_posts_count)
+
+User = get_user_model()
+
+
+class TestPostCounters(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counted')
+        cls.reader = User.objects.create_user(username='counter_reader')
+        cls.groups = [
+            Group.objects.create(title=f'Group {number}', slug=f'c{number}')
+            for number in range(2)
+        ]
+        for number in range(25):
+            Post.objects.create(
+                author=cls.author,
+                group=cls.groups[0],
+                text=f'Counted post {number}',
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_counts(self):
+        return (
+            get_posts_count(),
+            get_author_posts_count(self.author.id),
+            get_group_posts_count(self.groups[0].id),
+            get_group_posts_count(self.groups[1].id),
+            get_feed_posts_count(
+                User.objects.get(pk=self.reader.pk)),
+        )
+
+    def test_counters_follow_writes(self):
+        """Counters are changed by writes without counting again."""
+        self.assertEqual(self.get_counts(), (25, 25, 25, 0, 25))
+        post = Post.objects.create(
+            author=self.author, group=self.groups[0], text='New')
+        self.assertEqual(self.get_counts(), (26, 26, 26, 0, 26))
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.groups[1]
+        post.save()
+        self.assertEqual(self.get_counts(), (26, 26, 25, 1, 26))
+        post.delete()
+        with self.assertNumQueries(1):
+            # Reader only, followees and counters are in cache.
+            self.assertEqual(self.get_counts(), (25, 25, 25, 0, 25))
+
+    def test_deleted_posts_not_counted(self):
+        """Counter loaded after deletes counts only existing posts."""
+        Post.objects.filter(author=self.author).last().delete()
+        cache.clear()
+        self.assertEqual(get_posts_count(), 24)
+
+    def test_pages_not_counted(self):
+        """Pages show number of pages without COUNT(*)."""
+        client = Client()
+        client.force_login(self.reader)
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.groups[0].slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:follow_index'),
+        ):
+            with self.subTest(url=url):
+                client.get(url)
+                with record_queries() as recorder:
+                    response = client.get(url)
+                self.assertEqual(response.context['paginator'].num_pages, 3)
+                self.assertFalse([
+                    sql for sql in recorder.statements
+                    if 'COUNT(' in sql.upper()
+                ])
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from core.jobs import run_pending_jobs
+from core.models import Job
+from posts.hits import count_view, flush_views
+from posts.models import PendingView, Post
+
+User = get_user_model()
+
+
+@override_settings(
+    VIEW_COUNT_BUFFER=True,
+    VIEW_COUNT_FLUSH_THRESHOLD=5,
+    VIEW_COUNT_FLUSH_INTERVAL=3600,
+)
+class TestBufferedViews(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Текст поста')
+        cls.another_post = Post.objects.create(
+            author=cls.user,
+            text='Другой пост',
+        )
+
+    def setUp(self):
+        cache.clear()
+        cache.set('views:flushed', True)
+
+    def get_view_count(self, post):
+        return Post.objects.get(pk=post.pk).view_count
+
+    def test_views_written_by_threshold(self):
+        """Views stay in cache until threshold queues one flush."""
+        # Only the first view of every post lists it for flush.
+        with self.assertNumQueries(2):
+            for _ in range(3):
+                count_view(TestBufferedViews.post.id)
+            count_view(TestBufferedViews.another_post.id)
+        self.assertEqual(self.get_view_count(TestBufferedViews.post), 0)
+        count_view(TestBufferedViews.another_post.id)
+        count_view(TestBufferedViews.another_post.id)
+        self.assertEqual(
+            Job.objects.filter(name='posts.hits.flush_views').count(), 1)
+        self.assertEqual(self.get_view_count(TestBufferedViews.post), 0)
+        run_pending_jobs()
+        self.assertEqual(self.get_view_count(TestBufferedViews.post), 3)
+        self.assertEqual(
+            self.get_view_count(TestBufferedViews.another_post), 3)
+
+    def test_flush_keeps_counting(self):
+        """Flush writes views and resets buffer."""
+        count_view(TestBufferedViews.post.id)
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(flush_views(), 0)
+        count_view(TestBufferedViews.post.id)
+        flush_views()
+        self.assertEqual(self.get_view_count(TestBufferedViews.post), 2)
+
+    def test_posts_listed_once_until_flush(self):
+        """Post viewed again after flush is listed again."""
+        for _ in range(3):
+            count_view(TestBufferedViews.post.id)
+            count_view(TestBufferedViews.another_post.id)
+        self.assertEqual(PendingView.objects.count(), 2)
+        self.assertEqual(flush_views(), 6)
+        self.assertFalse(PendingView.objects.exists())
+        count_view(TestBufferedViews.post.id)
+        self.assertEqual(
+            list(PendingView.objects.values_list('post_id', flat=True)),
+            [TestBufferedViews.post.id],
+        )
+        self.assertEqual(flush_views(), 1)
+        self.assertEqual(self.get_view_count(TestBufferedViews.post), 4)
+
+    def test_detail_page_shows_buffered_views(self):
+        """Page of post count views without writes to database."""
+        client = Client()
+        url = reverse('posts:post_detail', args=[TestBufferedViews.post.id])
+        client.get(url)
+        response = client.get(url)
+        self.assertEqual(response.context.get('view_count'), 2)
+        self.assertEqual(self.get_view_count(TestBufferedViews.post), 0)
@@ -0,0 +1,148 @@
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from account.export import export
+from posts.importer import Importer, bulk_insert, parse_created
+from posts.models import (Comment, FeedItem, Follow, Post,
+                          get_author_posts_count)
+from posts.utils import search_posts
+
+User = get_user_model()
+RECORDS = [
+    {'type': 'user', 'author': 'legacy', 'first_name': 'Old', 'bio': 'Bio'},
+    {'type': 'post', 'id': 501, 'author': 'legacy', 'group': 'imported',
+     'created': '2015-03-01T10:00:00+00:00', 'text': 'Первый импорт'},
+    {'type': 'post', 'id': 502, 'author': 'legacy', 'text': 'Второй'},
+    {'type': 'post', 'id': 503, 'author': 'writer', 'text': 'Третий'},
+    {'type': 'comment', 'id': 1, 'post': 501, 'author': 'writer',
+     'created': '2015-03-02T10:00:00+00:00', 'text': 'Комментарий'},
+    {'type': 'comment', 'id': 2, 'post': 501, 'author': 'legacy',
+     'created': '2015-03-03T10:00:00+00:00', 'text': 'Ответ'},
+    {'type': 'comment', 'id': 3, 'post': 999, 'author': 'legacy',
+     'text': 'Post is unknown'},
+    {'type': 'like', 'post': 501, 'user': 'writer'},
+    {'type': 'like', 'post': 502, 'user': 'writer'},
+    {'type': 'follow', 'user': 'writer', 'author': 'legacy'},
+    {'type': 'follow', 'user': 'reader', 'author': 'legacy'},
+]
+
+
+class TestImport(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader')
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_import(self, name, content, *args):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        out = io.StringIO()
+        call_command('import_posts', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_rebuilds_denormalized_fields(self):
+        """Imported rows are counted as if receivers had run."""
+        # The smallest batches to cross batch borders.
+        out = self.run_import(
+            'legacy.ndjson',
+            '\n'.join(json.dumps(record) for record in RECORDS),
+            '--batch-size', '1',
+        )
+        self.assertIn('rows/s', out)
+        self.assertIn('comment: 1 skipped', out)
+        legacy = User.objects.get(username='legacy')
+        self.assertEqual(legacy.first_name, 'Old')
+        self.assertEqual(legacy.profile.bio, 'Bio')
+        self.assertEqual(legacy.profile.followers_count, 2)
+        self.assertFalse(legacy.has_usable_password())
+        post = Post.objects.get(text='Первый импорт')
+        self.assertEqual(post.group.slug, 'imported')
+        self.assertEqual(post.created.year, 2015)
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(
+            [comment.text for comment in post.get_last_comments()],
+            ['Комментарий', 'Ответ'],
+        )
+        self.assertEqual(post.likes, 1)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(list(search_posts('импорт')), [post])
+        self.assertEqual(get_author_posts_count(legacy.id), 2)
+
+    def test_export_imported_back(self):
+        """Export of account is imported as posts of given author."""
+        author = User.objects.create_user(username='exported')
+        post = Post.objects.create(author=author, text='Exported post')
+        Comment.objects.create(author=author, post=post, text='Own comment')
+        Follow.objects.create(user=author, author=self.reader)
+        content = ''.join(export(author, 'csv'))
+        Post.objects.all().delete()
+        self.run_import('export.csv', content, '--author', 'copy')
+        copy = User.objects.get(username='copy')
+        post = Post.objects.get(author=copy)
+        self.assertEqual(post.text, 'Exported post')
+        self.assertEqual(post.comments.get().author, copy)
+        self.assertTrue(
+            Follow.objects.filter(user=copy, author=self.reader).exists())
+
+    def test_ids_reserved_while_site_writes(self):
+        """Posts written during import don't take ids of imported ones."""
+        importer = Importer('legacy')
+        Post.objects.create(author=self.reader, text='Written before batch')
+        importer.add({'type': 'post', 'id': 1, 'text': 'Imported'})
+        importer.add({'type': 'comment', 'post': 1, 'text': 'Imported'})
+        importer.flush()
+        post = Post.objects.create(author=self.reader, text='Written after')
+        comment = Comment.objects.create(
+            author=self.reader, post=post, text='Written after')
+        importer.finish()
+        imported = Post.objects.get(text='Imported')
+        self.assertGreater(post.id, imported.id)
+        self.assertGreater(comment.id, imported.comments.get().id)
+
+    def test_failed_import_rebuilds_written_batches(self):
+        """Batches written before broken record are rebuilt."""
+        content = '\n'.join([
+            json.dumps({'type': 'follow', 'user': 'reader',
+                        'author': 'legacy'}),
+            json.dumps({'type': 'post', 'author': 'legacy', 'text': 'Kept'}),
+            '{broken',
+        ])
+        with self.assertRaises(ValueError):
+            self.run_import('broken.ndjson', content, '--batch-size', '1')
+        legacy = User.objects.get(username='legacy')
+        self.assertEqual(legacy.profile.followers_count, 1)
+        self.assertEqual(
+            list(FeedItem.objects.filter(user=self.reader).values_list(
+                'post__text', flat=True)),
+            ['Kept'],
+        )
+
+    def test_dates_kept_by_one_insert(self):
+        """Given dates are inserted at once, not updated after insert."""
+        posts = [
+            Post(author=self.reader, text=f'Dated {number}')
+            for number in range(3)
+        ]
+        for post in posts:
+            post.created = parse_created('2015-03-01T10:00:00+00:00')
+        with self.assertNumQueries(1):
+            bulk_insert(Post, posts)
+        self.assertEqual(
+            set(Post.objects.filter(author=self.reader).values_list(
+                'created__year', flat=True)),
+            {2015},
+        )
+        self.assertTrue(Post._meta.get_field('created').auto_now_add)
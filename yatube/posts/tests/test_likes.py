@@ -0,0 +1,122 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connection
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+from posts.models import Post
+
+User = get_user_model()
+
+
+def retry_locked(func, *args):
+    """
+    In-memory test database of SQLite uses shared cache, where lock
+    conflicts fail at once instead of waiting on busy timeout.
+    """
+    while True:
+        try:
+            return func(*args)
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            time.sleep(0.001)
+
+
+class TestLikes(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Текст поста')
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(TestLikes.user)
+
+    def get_likes(self):
+        return Post.objects.get(pk=TestLikes.post.pk).likes
+
+    def test_like_is_idempotent(self):
+        """Second like and second dislike change nothing."""
+        url = reverse('posts:like', args=[TestLikes.post.id])
+        for _ in range(2):
+            response = self.authorized_client.post(url)
+            self.assertRedirects(response, reverse('posts:index'))
+        self.assertEqual(self.get_likes(), 1)
+        self.assertTrue(
+            TestLikes.post.user_likes.filter(pk=TestLikes.user.pk).exists())
+        url = reverse('posts:dislike', args=[TestLikes.post.id])
+        for _ in range(2):
+            self.authorized_client.post(url)
+        self.assertEqual(self.get_likes(), 0)
+        self.assertFalse(TestLikes.post.user_likes.exists())
+
+    def test_ajax_response(self):
+        """AJAX caller get new state of like."""
+        response = self.authorized_client.post(
+            reverse('posts:like', args=[TestLikes.post.id]),
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(
+            response.json(),
+            {'post': TestLikes.post.id, 'liked': True, 'likes': 1},
+        )
+
+    def test_get_changes_nothing(self):
+        """Link or prefetch of like URL only leads to the post."""
+        for name in ('posts:like', 'posts:dislike'):
+            response = self.authorized_client.get(
+                reverse(name, args=[TestLikes.post.id]))
+            self.assertRedirects(response, reverse(
+                'posts:post_detail', args=[TestLikes.post.id]))
+        self.assertEqual(self.get_likes(), 0)
+        self.assertFalse(TestLikes.post.user_likes.exists())
+
+    def test_like_unexisting_post(self):
+        response = self.authorized_client.post(
+            reverse('posts:like', args=[TestLikes.post.id + 100]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Post.user_likes.through.objects.exists())
+
+
+class TestConcurrentLikes(TransactionTestCase):
+    threads = 8
+    repeats = 3
+
+    def setUp(self):
+        self.users = [
+            User.objects.create_user(username=f'user_{i}')
+            for i in range(self.threads)
+        ]
+        self.post = Post.objects.create(author=self.users[0], text='Пост')
+
+    def hammer(self, user, barrier, errors):
+        try:
+            barrier.wait()
+            for _ in range(self.repeats):
+                retry_locked(Post.add_like, self.post.id, user.id)
+                retry_locked(Post.remove_like, self.post.id, user.id)
+                retry_locked(Post.add_like, self.post.id, user.id)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            connection.close()
+
+    def test_no_lost_likes(self):
+        """Counter matches likes table after concurrent clicks."""
+        barrier = threading.Barrier(self.threads)
+        errors = []
+        workers = [
+            threading.Thread(target=self.hammer, args=(user, barrier, errors))
+            for user in self.users
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes, self.threads)
+        self.assertEqual(self.post.user_likes.count(), self.threads)
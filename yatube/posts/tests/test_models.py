@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
 from django.test import TestCase
-from posts.models import Group, Post
+from django.test.utils import CaptureQueriesContext
+from posts.models import VIEW_LAST_COMMENTS, Comment, Group, Post
 
 
 class PostModelTest(TestCase):
@@ -116,3 +119,65 @@ class GroupModelTest(TestCase):
                 response = GroupModelTest.group._meta.get_field(
                     field).help_text
                 self.assertEqual(response, expected_value)
+
+
+class CommentSnapshotTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        User = get_user_model()
+        cls.user = User.objects.create(
+            username='commentator',
+            first_name='Иван',
+            last_name='Петров',
+        )
+        cls.post = Post.objects.create(text='test_text', author=cls.user)
+
+    def test_counter_and_snapshot(self):
+        """Post keeps comment counter and last comments."""
+        comments = [
+            Comment.objects.create(
+                post=CommentSnapshotTest.post,
+                author=CommentSnapshotTest.user,
+                text=f'Комментарий {i}',
+            )
+            for i in range(VIEW_LAST_COMMENTS + 2)
+        ]
+        post = Post.objects.get(pk=CommentSnapshotTest.post.pk)
+        self.assertEqual(post.comment_count, len(comments))
+        self.assertTrue(post.has_more_comments())
+        with self.assertNumQueries(0):
+            last_comments = post.get_last_comments()
+        self.assertEqual(
+            [comment.id for comment in last_comments],
+            [comment.id for comment in comments[-VIEW_LAST_COMMENTS:]],
+        )
+        self.assertEqual(last_comments[0].author.get_full_name, 'Иван Петров')
+        self.assertEqual(last_comments[0].created, comments[2].created)
+
+        comments[-1].delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, len(comments) - 1)
+        self.assertEqual(
+            [comment.id for comment in post.get_last_comments()],
+            [comment.id for comment in comments[-VIEW_LAST_COMMENTS - 1:-1]],
+        )
+
+    def delete_post_with_comments(self, count):
+        post = Post.objects.create(text='Удаляемый', author=self.user)
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.user, text=f'Комментарий {i}')
+            for i in range(count)
+        )
+        # Content type of hitcount relation is cached by the first lookup.
+        ContentType.objects.get_for_model(Post)
+        with CaptureQueriesContext(connection) as context:
+            post.delete()
+        return len(context.captured_queries)
+
+    def test_delete_post_with_comments(self):
+        """Comments deleted with post don't update it one by one."""
+        # Comments are deleted by batches of 100.
+        self.assertEqual(self.delete_post_with_comments(10), 7)
+        self.assertEqual(self.delete_post_with_comments(90), 7)
+        self.assertFalse(Comment.objects.filter(text='Комментарий 0'))
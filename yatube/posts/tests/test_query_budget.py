@@ -0,0 +1,110 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.queries import record_queries
+from core.testing import QueryBudgetTestMixin
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+AUTHORS = 5
+POSTS = 60
+LARGE_POSTS = 600
+
+
+class TestQueryBudget(QueryBudgetTestMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(AUTHORS)
+        ]
+        cls.groups = [
+            Group.objects.create(title=f'Group {number}', slug=f'g{number}')
+            for number in range(2)
+        ]
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.reader, author=author)
+            Follow.objects.create(user=author, author=cls.reader)
+        cls.post = cls.add_data(0, POSTS)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[cls.groups[0].slug]),
+            reverse('posts:profile', args=[cls.authors[0].username]),
+            reverse('posts:post_detail', args=[cls.post.id]),
+        )
+
+    @classmethod
+    def add_data(cls, start, stop):
+        """
+        Add posts with numbers from start to stop, with comments, likes
+        and fans, who follow authors and comment the last post.
+        Return the last post.
+        """
+        for number in range(start, stop):
+            post = Post.objects.create(
+                author=cls.authors[number % AUTHORS],
+                group=cls.groups[number % 2] if number % 3 else None,
+                text=f'Post number {number}',
+            )
+            for comment in range(number % 4):
+                Comment.objects.create(
+                    author=cls.authors[comment],
+                    post=post,
+                    text=f'Comment {comment}',
+                )
+            if number % 2:
+                Post.add_like(post.id, cls.reader.id)
+        for number in range(start // 10, stop // 10):
+            fan = User.objects.create_user(username=f'fan{number}')
+            for author in (cls.reader, *cls.authors):
+                Follow.objects.create(user=fan, author=author)
+            Comment.objects.create(author=fan, post=post, text='Fan comment')
+        return post
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def count_queries(self, post):
+        """Number of queries of every page for reader and guest."""
+        cache.clear()
+        urls = (
+            *self.urls[:-1],
+            reverse('posts:post_detail', args=[post.id]),
+            reverse('posts:follow_index'),
+        )
+        counts = {}
+        for client, name in ((self.client, 'reader'), (Client(), 'guest')):
+            for url in urls:
+                with record_queries() as recorder:
+                    response = client.get(url)
+                view_name = response.resolver_match.view_name
+                counts[name, view_name] = recorder.count
+        return counts
+
+    def test_authorized_pages(self):
+        """Personal pages of reader stay within query budgets."""
+        for url in (*self.urls, reverse('posts:follow_index')):
+            with self.subTest(url=url):
+                self.assertQueryBudget(url)
+
+    def test_guest_pages(self):
+        """Pages built for guests stay within query budgets."""
+        guest = Client()
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, guest)
+
+    def test_queries_independent_of_data_size(self):
+        """Pages make as many queries with ten times more data."""
+        small = self.count_queries(self.post)
+        post = self.add_data(POSTS, LARGE_POSTS)
+        large = self.count_queries(post)
+        for key, count in small.items():
+            with self.subTest(key=key):
+                self.assertEqual(large[key], count)
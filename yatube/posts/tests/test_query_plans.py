@@ -0,0 +1,83 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from core.explain import find_problems, recommend_index
+from posts.benchmark import explain_requests, seed
+
+# Pages whose statements may sort or scan.
+SORTED_PAGES = {
+    # Matches are ordered by rank computed for every match of full text
+    # query, no index can give this order.
+    'posts:search', 'api:search',
+    # Form offers every group in select, so all of them are read.
+    'posts:post_create', 'posts:post_edit',
+}
+# Statements which read whole table by design.
+FULL_READS = {
+    # Counter of all posts is filled on cache miss only, then it is kept
+    # by writes, see get_posts_count().
+    'SELECT COUNT(*) AS "__count" FROM "posts_post"',
+}
+
+
+class TestQueryPlans(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        seed(300)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hot_queries_use_indexes(self):
+        """Lists and details neither scan tables nor sort rows."""
+        results = explain_requests()
+        self.assertIn('posts:profile', results)
+        self.assertIn('api:comments', results)
+        for name, statements in results.items():
+            if name in SORTED_PAGES:
+                continue
+            with self.subTest(name=name):
+                self.assertEqual(
+                    [statement for statement in statements
+                     if statement[0] not in FULL_READS],
+                    [],
+                )
+
+    def test_unbounded_scan_by_index(self):
+        """Scan by index is fine only if it stops at LIMIT."""
+        plan = ['SCAN posts_post USING INDEX post_created_id_idx']
+        sql = 'SELECT "posts_post"."id" FROM "posts_post" ORDER BY "id"'
+        self.assertEqual(find_problems(f'{sql} LIMIT 11', plan), [])
+        self.assertEqual(find_problems(sql, plan), plan)
+        self.assertEqual(
+            find_problems(f'{sql} WHERE "likes" > 1 LIMIT 11', plan), plan)
+
+    def test_recommend_index(self):
+        keyset = (
+            'SELECT "posts_post"."id" FROM "posts_post" '
+            'INNER JOIN "auth_user" T3 ON ("posts_post"."author_id" = T3."id")'
+            ' WHERE ("posts_post"."author_id" = 5 AND '
+            '("posts_post"."created" < \'2020-01-01\' OR '
+            '("posts_post"."id" < 3 AND '
+            '"posts_post"."created" = \'2020-01-01\'))) '
+            'ORDER BY "posts_post"."created" DESC, "posts_post"."id" DESC '
+            'LIMIT 21'
+        )
+        self.assertEqual(
+            recommend_index(keyset),
+            'posts_post (author_id, created DESC, id DESC)',
+        )
+        self.assertEqual(
+            recommend_index(
+                'SELECT "account_profile"."user_id" FROM "account_profile" '
+                'WHERE "account_profile"."followers_count" > 1000'),
+            'account_profile (followers_count)',
+        )
+        feed = (
+            'SELECT "posts_post"."id" FROM "posts_post" INNER JOIN '
+            '"posts_feeditem" ON ("posts_post"."id" = '
+            '"posts_feeditem"."post_id") WHERE "posts_feeditem"."user_id" = 1'
+            ' ORDER BY "posts_post"."created" DESC'
+        )
+        self.assertIsNone(recommend_index(feed))
@@ -0,0 +1,85 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Post
+from posts.search import build_match, stem
+from posts.utils import search_posts
+
+User = get_user_model()
+
+
+class StemmerTest(TestCase):
+    def test_word_forms_have_same_stem(self):
+        """Forms of Russian word are reduced to one stem."""
+        forms = (
+            ('кот', 'коты', 'котов', 'котом'),
+            ('красивый', 'красивые', 'красивая', 'красивого'),
+            ('ёлка', 'елки', 'ёлкой'),
+        )
+        for words in forms:
+            with self.subTest(words=words):
+                self.assertEqual(len({stem(word) for word in words}), 1)
+
+    def test_build_match(self):
+        """Words are stemmed, the last one is searched by prefix."""
+        self.assertEqual(build_match('Красивые кошки'), '"красив" "кошк"*')
+        self.assertIsNone(build_match(' !? '))
+
+
+class TestSearch(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.dog = Post.objects.create(author=cls.user, text='Собака и кот')
+        cls.cat = Post.objects.create(author=cls.user, text='Рыжие коты')
+        for text in ('Про погоду', 'Про музыку', 'Про спорт', 'Про кино'):
+            Post.objects.create(author=cls.user, text=text)
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query):
+        return list(search_posts(query).values_list('id', flat=True))
+
+    def test_ranking(self):
+        """Posts are found by any form of word, better match first."""
+        self.assertEqual(self.search('котами'), [self.cat.id, self.dog.id])
+        self.assertEqual(self.search('кот собаки'), [self.dog.id])
+        self.assertEqual(self.search(''), [])
+
+    def test_index_follows_changes(self):
+        """Index is updated on edit, comments and delete."""
+        post = Post.objects.create(author=self.user, text='Первый текст')
+        self.assertEqual(self.search('первый'), [post.id])
+        post.text = 'Второй текст'
+        post.save()
+        self.assertEqual(self.search('первый'), [])
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Отличные новости')
+        self.assertEqual(self.search('новость'), [post.id])
+        self.assertEqual(self.search('второй'), [post.id])
+        comment.delete()
+        self.assertEqual(self.search('новость'), [])
+        post.delete()
+        self.assertEqual(self.search('второй'), [])
+
+    def test_search_page(self):
+        """Search page shows found posts."""
+        response = self.client.get(reverse('posts:search'), {'q': 'кот'})
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page_obj']), [self.cat, self.dog])
+        self.assertEqual(response.context['query'], 'кот')
+
+    def test_admin_uses_index(self):
+        """Admin search of posts uses full-text index."""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@test.ru', password='pass')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'коты'})
+        self.assertEqual(
+            {post.id for post in response.context['cl'].result_list},
+            {self.cat.id, self.dog.id},
+        )
@@ -3,10 +3,16 @@ from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.http import HttpResponse
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from core.cache import cache_page_response, get_page_cache_stats
+from core.jobs import run_pending_jobs
+from posts.hits import get_post_key
 from posts.forms import CommentForm, PostForm
-from posts.models import Comment, Follow, Group, Post
+from posts.models import (Comment, FeedItem, Follow, Group, Post,
+                          get_followees, resolve_group, resolve_user)
 import shutil
 import tempfile
 
@@ -222,6 +228,26 @@ class PaginatorTest(TestCase):
         response = self.authorized_client.get(url)
         return len(response.context.get('page_obj'))
 
+    def test_cursor_links(self):
+        """Next and previous cursor links of paginator."""
+        for url in PaginatorTest.urls_paginator:
+            with self.subTest(url=url):
+                first_page = self.authorized_client.get(url).context.get(
+                    'page_obj')
+                self.assertFalse(first_page.has_previous())
+                response = self.authorized_client.get(
+                    f'{url}?{first_page.next_query}')
+                second_page = response.context.get('page_obj')
+                self.assertEqual(second_page.number, 2)
+                self.assertEqual(len(second_page), 3)
+                self.assertFalse(second_page.has_next())
+                response = self.authorized_client.get(
+                    f'{url}?{second_page.previous_query}')
+                self.assertEqual(
+                    list(response.context.get('page_obj')),
+                    list(first_page),
+                )
+
 
 class TestCreatingPost(TestCase):
     @classmethod
@@ -304,28 +330,268 @@ class TestCachePages(TestCase):
         cache.clear()
 
     def test_cache_index_page(self):
-        """Delete post and check of index page."""
+        """Index page is cached until posts change."""
         response = TestCachePages.guest_client.get(reverse('posts:index'))
         content_before = response.content
-        self.post.delete()
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        Post.objects.filter(pk=self.post.pk).update(text='Silent change')
 
         response = TestCachePages.guest_client.get(reverse('posts:index'))
-        content_after_remove_post = response.content
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
         self.assertEqual(
             content_before,
-            content_after_remove_post,
+            response.content,
             'Cache of Index page not work correctly'
         )
 
-        cache.clear()
+        self.post.delete()
         response = TestCachePages.guest_client.get(reverse('posts:index'))
-        content_after_clear_cache = response.content
         self.assertNotEqual(
             content_before,
-            content_after_clear_cache,
-            'Cache of Index page not work correctly'
+            response.content,
+            'Cache of Index page not dropped after post change'
+        )
+        self.assertEqual(
+            get_page_cache_stats(),
+            {'hits': 1, 'misses': 2, 'hit_rate': 1 / 3},
+        )
+
+    def test_authorized_user_not_cached(self):
+        """Authorized user always get personal page."""
+        authorized_client = Client()
+        authorized_client.force_login(TestCachePages.user)
+        authorized_client.get(reverse('posts:index'))
+        response = authorized_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_comment_drops_profile_page(self):
+        """New comment drops cached pages with post."""
+        post = Post.objects.create(
+            author=TestCachePages.user,
+            text='Post with comments',
+        )
+        url = reverse('posts:profile', args=[TestCachePages.user.username])
+        TestCachePages.guest_client.get(url)
+        Comment.objects.create(
+            author=TestCachePages.user,
+            post=post,
+            text='Comment of cached post',
+        )
+        response = TestCachePages.guest_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'MISS')
+        self.assertContains(response, 'Comment of cached post')
+
+    def test_unknown_params_not_cached(self):
+        """Only pagination params make cached pages."""
+        url = reverse('posts:index')
+        TestCachePages.guest_client.get(url, {'page': 1})
+        response = TestCachePages.guest_client.get(url, {'page': 1})
+        self.assertEqual(response['X-Page-Cache'], 'HIT')
+        for params in ({'utm': 'x'}, {'page': 1, 'junk': 'x'},
+                       {'page': [1, 2]}):
+            with self.subTest(params=params):
+                response = TestCachePages.guest_client.get(url, params)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('X-Page-Cache'))
+
+    def test_response_with_cookies_not_cached(self):
+        """Responses setting cookies are not shared."""
+        response = HttpResponse('personal')
+        response.set_cookie('name', 'value')
+        cache_page_response('page:cookie', response)
+        self.assertIsNone(cache.get('page:cookie'))
+        response = HttpResponse('shared')
+        cache_page_response('page:shared', response)
+        self.assertIsNotNone(cache.get('page:shared'))
+        response = HttpResponse('by language')
+        patch_vary_headers(response, ('Accept-Language',))
+        cache_page_response('page:language', response)
+        self.assertIsNone(cache.get('page:language'))
+
+    def test_group_change_drops_pages(self):
+        """Cached pages show new title of group."""
+        group = Group.objects.create(title='Old title', slug='renamed-group')
+        Post.objects.create(
+            author=TestCachePages.user, group=group, text='Post of group')
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[group.slug]),
+            reverse('posts:profile', args=[TestCachePages.user.username]),
+        )
+        for url in urls:
+            TestCachePages.guest_client.get(url)
+        group.title = 'New title'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = TestCachePages.guest_client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'MISS')
+                self.assertContains(response, 'New title')
+                self.assertNotContains(response, 'Old title')
+
+    def test_name_change_drops_pages(self):
+        """Cached pages show new name of author."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[TestCachePages.user.username]),
+        )
+        post = Post.objects.create(
+            author=TestCachePages.user,
+            text='Post of renamed author',
+        )
+        for url in urls:
+            TestCachePages.guest_client.get(url)
+        user = User.objects.get(pk=TestCachePages.user.pk)
+        user.first_name = 'Renamed'
+        user.save()
+        self.assertEqual(
+            Post.objects.get(pk=post.pk).version, post.version + 1)
+        for url in urls:
+            with self.subTest(url=url):
+                response = TestCachePages.guest_client.get(url)
+                self.assertEqual(response['X-Page-Cache'], 'MISS')
+                self.assertContains(response, 'Renamed')
+
+
+class TestResolveCache(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='resolved')
+        cls.group = Group.objects.create(title='Resolved', slug='resolved')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_cached(self):
+        resolve_group('resolved')
+        resolve_user('resolved')
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_group('resolved'), self.group)
+            self.assertEqual(resolve_user('resolved'), self.user)
+
+    def test_user_cached_without_password(self):
+        """Only public fields of user are kept in cache."""
+        resolve_user('resolved')
+        self.assertEqual(
+            cache.get('user:fields:resolved'),
+            {'id': self.user.pk, 'username': 'resolved',
+             'first_name': '', 'last_name': ''},
+        )
+        user = resolve_user('resolved')
+        self.assertEqual(user.get_deferred_fields(), {
+            'password', 'last_login', 'is_superuser', 'email', 'is_staff',
+            'is_active', 'date_joined',
+        })
+
+    def test_renamed_group_and_user_dropped(self):
+        """Old slug and username stop resolving after save."""
+        self.client.get(reverse('posts:group_list', args=['resolved']))
+        self.client.get(reverse('posts:profile', args=['resolved']))
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'renamed'
+        user.save()
+        for name in ('posts:group_list', 'posts:profile'):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, args=['resolved']))
+                self.assertEqual(response.status_code, 404)
+                response = self.client.get(reverse(name, args=['renamed']))
+                self.assertEqual(response.status_code, 200)
+
+
+class TestConditionalGet(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='etaguser')
+        cls.other = User.objects.create_user(username='etagother')
+        cls.group = Group.objects.create(title='Group', slug='etag-group')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            group=cls.group,
+            text='Post with ETag',
         )
 
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_pages_not_modified(self):
+        """Request with ETag of unchanged page gets 304 at once."""
+        urls = (
+            (reverse('posts:index'), 0),
+            (reverse('posts:group_list', args=[self.group.slug]), 0),
+            (reverse('posts:profile', args=[self.user.username]), 0),
+            (reverse('posts:post_detail', args=[self.post.id]), 1),
+        )
+        for url, queries in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                etag = response['ETag']
+                self.assertIn('no-cache', response['Cache-Control'])
+                with self.assertNumQueries(queries):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+
+    def test_group_edit_changes_etag(self):
+        """Pages showing group are built again after group is edited."""
+        self.client.force_login(self.other)
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('api:index'),
+            reverse('api:group', args=[self.group.slug]),
+            reverse('api:post', args=[self.post.id]),
+        )
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Edited group'
+        group.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etags[url])
+
+    def test_etag_changes_with_page(self):
+        """Comment, like and login change ETag of page."""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            author=self.other, post=self.post, text='New comment')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'New comment')
+        index = reverse('posts:index')
+        etag = self.client.get(index)['ETag']
+        Post.add_like(self.post.id, self.other.id)
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.client.force_login(self.other)
+        response = self.client.get(index, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified_post_view_counted(self):
+        """View of post is counted even if page is not sent."""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        etag = self.client.get(url)['ETag']
+        self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cache.get(get_post_key(self.post.id)), 2)
+
+    def test_missing_post_not_found(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id + 100]),
+            HTTP_IF_NONE_MATCH='"etag"',
+        )
+        self.assertEqual(response.status_code, 404)
+
 
 class TestFollow(TestCase):
     @classmethod
@@ -380,3 +646,233 @@ class TestFollow(TestCase):
         response = self.unfollower_client.get(reverse('posts:follow_index'))
         page = response.context.get('page_obj')
         self.assertNotIn(post, page, 'User what not follow see new post')
+
+    def test_followees_cache_updated(self):
+        """Cached followees follow changes and replace queries."""
+        cache.clear()
+        profile = reverse('posts:profile', args=[TestFollow.author])
+        self.unfollower_client.get(profile)
+        self.assertEqual(
+            cache.get(f'followees:{TestFollow.not_follower.id}'), set())
+        self.unfollower_client.get(
+            reverse('posts:profile_follow', args=[TestFollow.author]))
+        self.unfollower_client.get(
+            reverse('posts:profile_follow', args=[TestFollow.author]))
+        self.assertEqual(
+            Follow.objects.filter(user=TestFollow.not_follower).count(), 1)
+        user = User.objects.get(pk=TestFollow.not_follower.pk)
+        self.assertEqual(get_followees(user), {TestFollow.author.id})
+        response = self.unfollower_client.get(profile)
+        self.assertContains(
+            response,
+            reverse('posts:profile_unfollow', args=[TestFollow.author]),
+        )
+        self.unfollower_client.get(
+            reverse('posts:profile_unfollow', args=[TestFollow.author]))
+        response = self.unfollower_client.get(profile)
+        self.assertContains(
+            response,
+            reverse('posts:profile_follow', args=[TestFollow.author]),
+        )
+
+    def test_follow_with_stale_cache(self):
+        """Follow is created even if cached followees already have it."""
+        key = f'followees:{TestFollow.not_follower.id}'
+        cache.set(key, frozenset({TestFollow.author.id}))
+        self.unfollower_client.get(
+            reverse('posts:profile_follow', args=[TestFollow.author]))
+        self.assertTrue(Follow.objects.filter(
+            user=TestFollow.not_follower, author=TestFollow.author).exists())
+        self.assertIsNone(cache.get(key))
+
+
+class TestFollowFeed(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.follower = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='Post created before follow',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(TestFollowFeed.follower)
+
+    def get_feed(self, query=''):
+        response = self.follower_client.get(
+            f'{reverse("posts:follow_index")}?{query}')
+        return response.context.get('page_obj')
+
+    def test_follow_backfill_and_unfollow_prune(self):
+        """Follow add old posts to feed, unfollow remove them."""
+        self.follower_client.get(reverse(
+            'posts:profile_follow',
+            args=[TestFollowFeed.author]
+        ))
+        self.assertTrue(FeedItem.objects.filter(
+            user=TestFollowFeed.follower,
+            post=TestFollowFeed.old_post,
+        ).exists())
+        self.assertIn(TestFollowFeed.old_post, list(self.get_feed()))
+        self.follower_client.get(reverse(
+            'posts:profile_unfollow',
+            args=[TestFollowFeed.author]
+        ))
+        self.assertFalse(FeedItem.objects.filter(
+            user=TestFollowFeed.follower).exists())
+        self.assertEqual(list(self.get_feed()), [])
+
+    def test_new_post_fan_out(self):
+        """New post delivered to feed of followers."""
+        Follow.objects.create(
+            user=TestFollowFeed.follower,
+            author=TestFollowFeed.author,
+        )
+        post = Post.objects.create(
+            author=TestFollowFeed.author,
+            text='New post',
+        )
+        self.assertTrue(FeedItem.objects.filter(
+            user=TestFollowFeed.follower,
+            post=post,
+        ).exists())
+        self.assertEqual(
+            list(self.get_feed()), [post, TestFollowFeed.old_post])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_pull_author_merged_on_read(self):
+        """Posts of author with many followers merged at read time."""
+        Follow.objects.create(
+            user=TestFollowFeed.follower,
+            author=TestFollowFeed.author,
+        )
+        post = Post.objects.create(
+            author=TestFollowFeed.author,
+            text='Post of popular author',
+        )
+        self.assertFalse(FeedItem.objects.filter(
+            user=TestFollowFeed.follower).exists())
+        self.assertEqual(
+            list(self.get_feed()), [post, TestFollowFeed.old_post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_pages_merge_pushed_and_pulled_posts(self):
+        """Pages of feed keep order across pushed and pulled posts."""
+        pushed_author = User.objects.create_user(username='pushed')
+        fan = User.objects.create_user(username='fan')
+        for user in (TestFollowFeed.follower, fan):
+            Follow.objects.create(user=user, author=TestFollowFeed.author)
+        Follow.objects.create(
+            user=TestFollowFeed.follower, author=pushed_author)
+        posts = [TestFollowFeed.old_post]
+        for number in range(14):
+            author = (TestFollowFeed.author, pushed_author)[number % 2]
+            posts.append(
+                Post.objects.create(author=author, text=f'Post {number}'))
+        first = self.get_feed()
+        self.assertEqual(first.paginator.count, 15)
+        second = self.get_feed(first.next_query)
+        self.assertEqual(list(first) + list(second), posts[::-1])
+        self.assertEqual(list(self.get_feed(second.previous_query)),
+                         list(first))
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_unfollow_queues_backfill_of_followers(self):
+        """Author pushed to followers again is backfilled by worker."""
+        fan = User.objects.create_user(username='fan')
+        for user in (TestFollowFeed.follower, fan):
+            Follow.objects.create(user=user, author=TestFollowFeed.author)
+        pulled_post = Post.objects.create(
+            author=TestFollowFeed.author, text='Not pushed')
+        Follow.objects.filter(user=fan).delete()
+        delivered = FeedItem.objects.filter(
+            user=TestFollowFeed.follower, post=pulled_post)
+        self.assertFalse(delivered.exists())
+        run_pending_jobs()
+        self.assertTrue(delivered.exists())
+
+
+class TestLikedPosts(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.another_user = User.objects.create_user(username='another')
+        cls.liked_post = Post.objects.create(author=cls.user, text='Liked')
+        cls.post = Post.objects.create(author=cls.user, text='Not liked')
+        cls.liked_post.user_likes.add(cls.user)
+        cls.post.user_likes.add(cls.another_user)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(TestLikedPosts.user)
+        cache.clear()
+
+    def test_liked_posts_in_context(self):
+        """Only posts liked by current user are marked."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[TestLikedPosts.user.username]),
+            reverse('posts:post_detail', args=[TestLikedPosts.liked_post.id]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertEqual(
+                    response.context.get('liked_posts'),
+                    {TestLikedPosts.liked_post.id},
+                )
+
+    def test_guest_has_no_liked_posts(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.context.get('liked_posts'), set())
+
+
+class TestPostFragmentCache(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='test_user')
+        cls.post = Post.objects.create(author=cls.user, text='Старый текст')
+        cls.url = reverse('posts:profile', args=[cls.user.username])
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_fragment_cached_until_version_changes(self):
+        """Rendered post is cached until post version is bumped."""
+        self.assertContains(self.guest_client.get(self.url), 'Старый текст')
+        Post.objects.filter(pk=self.post.pk).update(text='Тихая правка')
+        self.assertContains(self.guest_client.get(self.url), 'Старый текст')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        self.assertEqual(post.version, self.post.version + 1)
+        self.assertContains(self.guest_client.get(self.url), 'Новый текст')
+
+    def test_comment_bumps_version(self):
+        """New comment is shown at once."""
+        self.guest_client.get(self.url)
+        Comment.objects.create(
+            author=self.user,
+            post=self.post,
+            text='Свежий комментарий',
+        )
+        self.assertContains(
+            self.guest_client.get(self.url), 'Свежий комментарий')
+
+    def test_liked_state_not_cached(self):
+        """Like form depends on user, not on cached fragment."""
+        authorized_client = Client()
+        authorized_client.force_login(self.user)
+        self.guest_client.get(self.url)
+        Post.user_likes.through.objects.create(
+            post_id=self.post.id, user_id=self.user.id)
+        response = authorized_client.get(self.url)
+        self.assertContains(
+            response, reverse('posts:dislike', args=[self.post.id]))
@@ -16,6 +16,7 @@ urlpatterns = [
         views.ProfileListView.as_view(),
         name='profile'
     ),
+    path('search/', views.SearchListView.as_view(), name='search'),
     path(
         'posts/<int:post_id>/',
         views.PostDetailView.as_view(),
@@ -1,15 +1,125 @@
-from django.core.paginator import Paginator
-from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+import heapq
+from itertools import islice
 
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.http import Http404
 
-def create_paginator(request, objects, limit):
-    """Create paginator."""
-    paginator = Paginator(objects, limit)
+from core.paginator import CountedPaginator, CursorPaginator
+from .models import (FeedItem, Post, get_followees, get_pull_authors,
+                     resolve_group, resolve_user)
+from .search import SEARCH_RANK, SEARCH_TABLE, build_match
+
+
+def create_paginator(request, objects, limit, count=None):
+    """Create paginator, count is taken from counter if it is given."""
+    paginator = CountedPaginator(objects, limit, count=count)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
 def get_user_object(username):
-    User = get_user_model()
-    return get_object_or_404(User, username=username)
+    user = resolve_user(username)
+    if user is None:
+        raise Http404('No user matches the given query.')
+    return user
+
+
+def get_group_object(slug):
+    group = resolve_group(slug)
+    if group is None:
+        raise Http404('No group matches the given query.')
+    return group
+
+
+def get_feed_sources(user):
+    """
+    Querysets of keys of follow feed with their orderings: FeedItem rows
+    of user and posts of every followed author with too many followers
+    for fan-out on write.
+    """
+    followees = get_followees(user)
+    if not followees:
+        return []
+    pull_authors = get_pull_authors() & followees
+    items = FeedItem.objects.filter(user_id=user.pk)
+    if pull_authors:
+        # Rows left from times when author was pushed to followers.
+        items = items.exclude(author_id__in=pull_authors)
+    sources = [(items, ('-created', '-post_id'))]
+    sources.extend(
+        (Post.objects.filter(author_id=author_id), ('-created', '-id'))
+        for author_id in sorted(pull_authors)
+    )
+    return sources
+
+
+class FeedPaginator(CursorPaginator):
+    """
+    Keyset paginator of follow feed of user, the newest posts first.
+    Keys of page are read from FeedItem rows by index (user, created,
+    post) and from posts of every pull author by index (author, created,
+    id), merged in Python. Posts of page are fetched from object_list by
+    ids.
+    """
+    def __init__(self, object_list, per_page, user=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.sources = [
+            CursorPaginator(queryset, per_page, ordering=ordering)
+            for queryset, ordering in get_feed_sources(user)
+        ]
+
+    def get_keys(self, key=None, reverse=False, limit=None, offset=0):
+        keys = heapq.merge(
+            *(
+                source.get_keys(key, reverse, limit=offset + limit)
+                for source in self.sources
+            ),
+            reverse=not reverse,
+        )
+        return list(islice(keys, offset, offset + limit))
+
+    def get_objects(self, key=None, reverse=False, limit=None, offset=0):
+        ids = [
+            post_id
+            for _, post_id in self.get_keys(key, reverse, limit, offset)
+        ]
+        if not ids:
+            return []
+        posts = {
+            self.get_key(post)[-1]: post
+            for post in self.object_list.filter(id__in=ids).order_by()
+        }
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def get_liked_posts(user, posts):
+    """Ids of posts liked by user, one query for whole page."""
+    if not user.is_authenticated or not posts:
+        return set()
+    likes = Post.user_likes.through.objects.filter(
+        user_id=user.id,
+        post_id__in=[post.id for post in posts],
+    )
+    return set(likes.values_list('post_id', flat=True))
+
+
+def search_posts(query):
+    """
+    Posts found by full-text index, annotated by rank.
+    The lower rank is, the better post matches query.
+    """
+    match = build_match(query)
+    if match is None:
+        return Post.objects.annotate(
+            rank=Value(0, output_field=FloatField())).none()
+    return Post.objects.extra(
+        tables=[SEARCH_TABLE],
+        where=[
+            f'{SEARCH_TABLE}.rowid = {Post._meta.db_table}.id',
+            f'{SEARCH_TABLE} MATCH %s',
+        ],
+        params=[match],
+    ).annotate(
+        rank=RawSQL(SEARCH_RANK, (), output_field=FloatField()),
+    ).order_by('rank', 'id')
@@ -1,94 +1,165 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.contrib.auth import get_user_model
-from django.views.decorators.cache import cache_page
-from django.views.generic import CreateView, ListView, UpdateView
+from django.views.generic import CreateView, DetailView, ListView, UpdateView
 from django.urls import reverse_lazy
 from django.utils.decorators import method_decorator
-from hitcount.views import HitCountDetailView
+from django.utils.functional import cached_property
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from hitcount.models import HitCount
+from hitcount.views import HitCountMixin
 
 from .decorators import post_owner_only
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
-from .utils import get_user_object
-from core.views import LastPageRedirectView
+from .hits import count_view
+from .models import (Follow, Post, get_author_posts_count,
+                     get_feed_posts_count, get_group_posts_count,
+                     get_posts_count)
+from .utils import (FeedPaginator, get_group_object, get_liked_posts,
+                    get_user_object, search_posts)
+from core.cache import get_generations
+from core.views import (AnonymousPageCacheMixin, ConditionalGetMixin,
+                        CursorPaginationMixin, LastPageRedirectView)
 
 POST_LIMIT = settings.POST_LIMIT_ON_PAGE
 User = get_user_model()
 
 
-@method_decorator(cache_page(1), name='dispatch')
-class IndexListView(ListView):
+class LikedPostsMixin:
+    """Add ids of posts on page liked by current user."""
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['liked_posts'] = get_liked_posts(
+            self.request.user,
+            context['page_obj'],
+        )
+        return context
+
+
+class IndexListView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                    LikedPostsMixin, CursorPaginationMixin, ListView):
     """Index page."""
+    query_budget = 7
     template_name = 'posts/index.html'
     paginate_by = POST_LIMIT
     model = Post
+    cache_generations = ('posts',)
+
+    def get_object_count(self):
+        return get_posts_count()
 
     def get_queryset(self):
         queryset = self.model.objects.select_related(
-            'author', 'group', 'author__profile').prefetch_related(
-            'comments', 'comments__author', 'user_likes', 'hit_count_generic'
-        ).all()
+            'author', 'group', 'author__profile').all()
         return queryset
 
 
-class GroupListView(ListView):
+class GroupListView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                    LikedPostsMixin, CursorPaginationMixin, ListView):
     """Page of group."""
+    query_budget = 8
     template_name = 'posts/group_list.html'
     paginate_by = POST_LIMIT
     model = Post
 
+    @cached_property
+    def group(self):
+        return get_group_object(self.kwargs.get('slug'))
+
+    def get_cache_generations(self):
+        return ('profiles', f'group:{self.group.id}')
+
+    def get_object_count(self):
+        return get_group_posts_count(self.group.id)
+
     def get_queryset(self):
-        group = get_object_or_404(Group, slug=self.kwargs.get('slug'))
-        queryset = group.posts.select_related(
-            'author', 'group', 'author__profile').prefetch_related(
-            'comments', 'comments__author', 'user_likes', 'hit_count_generic'
-        ).all()
+        queryset = self.group.posts.select_related(
+            'author', 'group', 'author__profile').all()
         return queryset
 
     def get_context_data(self, *, object_list=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['group'] = get_object_or_404(
-            Group,
-            slug=self.kwargs.get('slug')
-        )
+        context['group'] = self.group
         return context
 
 
-class ProfileListView(ListView):
+class ProfileListView(ConditionalGetMixin, AnonymousPageCacheMixin,
+                      LikedPostsMixin, CursorPaginationMixin, ListView):
     """Page of Author."""
+    query_budget = 9
     template_name = 'posts/profile.html'
     paginate_by = POST_LIMIT
     model = Post
 
+    @cached_property
+    def author(self):
+        return get_user_object(self.kwargs.get('username'))
+
+    def get_cache_generations(self):
+        return ('profiles', f'author:{self.author.id}')
+
+    def get_object_count(self):
+        return get_author_posts_count(self.author.id)
+
     def get_queryset(self):
-        author = get_object_or_404(User, username=self.kwargs.get('username'))
-        queryset = author.posts.select_related(
-            'author', 'group', 'author__profile').prefetch_related(
-            'comments', 'comments__author', 'user_likes', 'hit_count_generic'
-        ).all()
+        queryset = self.author.posts.select_related(
+            'author', 'group', 'author__profile').all()
         return queryset
 
     def get_context_data(self, object_list=None, *args, **kwargs):
         context = super().get_context_data(**kwargs)
-        username = self.kwargs.get('username')
-        author = get_object_or_404(User, username=username)
-        context['author'] = author
-        if self.request.user.is_authenticated:
-            following = author.following.filter(user=self.request.user)
-            context['following'] = following
+        context['author'] = self.author
         return context
 
 
-class PostDetailView(HitCountDetailView):
-    """Page of Post."""
+class SearchListView(LikedPostsMixin, CursorPaginationMixin, ListView):
+    """Posts found by query, the best matches first."""
+    template_name = 'posts/search.html'
+    paginate_by = POST_LIMIT
+    cursor_ordering = ('rank', 'id')
+
+    def get_queryset(self):
+        queryset = search_posts(self.request.GET.get('q')).select_related(
+            'author', 'group', 'author__profile')
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+class PostDetailView(ConditionalGetMixin, HitCountMixin, DetailView):
+    """
+    Page of Post.
+    With VIEW_COUNT_BUFFER views are counted in cache and flushed to
+    database in batches, otherwise every view is recorded by hitcount.
+    The first view since flush lists post for it by one more query.
+    """
+    query_budget = 10
     model = Post
     template_name = 'posts/post_detail.html'
     context_object_name = 'post'
     slug_field = 'post_id'
     count_hit = True
 
+    def get_etag_parts(self):
+        """Version of post and generations of its author."""
+        post = Post.objects.filter(pk=self.kwargs.get('post_id')).values(
+            'version', 'author_id').first()
+        if post is None:
+            return None
+        return (post['version'], *get_generations(
+            'profiles', f'author:{post["author_id"]}'))
+
+    def not_modified(self):
+        # Hitcount skips repeated views of session anyway.
+        if self.count_hit and settings.VIEW_COUNT_BUFFER:
+            count_view(self.kwargs.get('post_id'))
+
     def get_object(self, queryset=None):
         obj = get_object_or_404(
             Post.objects.select_related(
@@ -101,11 +172,29 @@ class PostDetailView(HitCountDetailView):
     def get_context_data(self, **kwargs):
         context = super(PostDetailView, self).get_context_data(**kwargs)
         form = CommentForm()
-        post_count = self.object.author.posts.count()
-        context['post_count'] = post_count
+        context['post_count'] = get_author_posts_count(
+            self.object.author_id)
         context['form'] = form
+        context['liked_posts'] = get_liked_posts(
+            self.request.user,
+            [self.object],
+        )
+        if self.count_hit:
+            context['view_count'] = self.count_view()
         return context
 
+    def count_view(self):
+        """Count view of post, return number of views to show."""
+        post = self.object
+        if settings.VIEW_COUNT_BUFFER:
+            return post.view_count + count_view(post.id)
+        hit_count = HitCount.objects.get_for_object(post)
+        if not self.hit_count(self.request, hit_count).hit_counted:
+            return post.view_count
+        Post.objects.filter(pk=post.pk).update(
+            view_count=F('view_count') + 1)
+        return post.view_count + 1
+
 
 @method_decorator(login_required, name='dispatch')
 class CommentCreateView(CreateView):
@@ -173,33 +262,45 @@ class PostUpdateView(UpdateView):
 
 
 @method_decorator(login_required, name='dispatch')
-class FollowsListView(ListView):
+class FollowsListView(LikedPostsMixin, CursorPaginationMixin, ListView):
     """Page with posts of follows author."""
+    query_budget = 9
     template_name = 'posts/follow.html'
     paginate_by = POST_LIMIT
+    paginator_class = FeedPaginator
     model = Post
 
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset, per_page, user=self.request.user, **kwargs)
+
     def get_queryset(self):
         queryset = self.model.objects.select_related(
-            'author', 'group', 'author__profile').prefetch_related(
-            'comments', 'comments__author', 'user_likes', 'hit_count_generic'
-        ).filter(author__following__user=self.request.user)
+            'author', 'group', 'author__profile')
         return queryset
 
+    def get_object_count(self):
+        return get_feed_posts_count(self.request.user)
+
 
 @method_decorator(login_required, name='dispatch')
 class FollowRedirectView(LastPageRedirectView):
     """
     Follow to username.
     User can't follow yourself.
-    If user already follow, don't create new one.
+    If user already follow, unique constraint keeps the only one, cached
+    follows may be stale, so insert is always tried.
     """
     def get(self, request, *args, **kwargs):
         author = get_user_object(kwargs.get('username'))
         user = request.user
-        follow = Follow.objects.filter(user=user, author=author).exists()
-        if author != user and not follow:
-            Follow.objects.create(user=user, author=author)
+        if author != user:
+            try:
+                with transaction.atomic():
+                    Follow.objects.create(user=user, author=author)
+            except IntegrityError:
+                # Already followed.
+                pass
         return redirect(self.get_redirect_url(*args, **kwargs))
 
 
@@ -212,27 +313,48 @@ class UnFollowRedirectView(LastPageRedirectView):
         return redirect(self.get_redirect_url(*args, **kwargs))
 
 
+class BaseLikeView(LastPageRedirectView):
+    """
+    Change like of post without loading it, liked tells to add or remove
+    it. AJAX callers get JSON with new state, others are redirected back.
+    GET only leads to the post, so links and prefetch change nothing.
+    """
+    http_method_names = ('get', 'post')
+    liked = True
+
+    def change_like(self, post_id, user_id):
+        if self.liked:
+            return Post.add_like(post_id, user_id)
+        return Post.remove_like(post_id, user_id)
+
+    def post(self, request, *args, **kwargs):
+        post_id = kwargs.get('post_id')
+        try:
+            self.change_like(post_id, request.user.id)
+        except Post.DoesNotExist:
+            raise Http404
+        if request.is_ajax() or 'application/json' in request.META.get(
+                'HTTP_ACCEPT', ''):
+            likes = Post.objects.filter(pk=post_id).values_list(
+                'likes', flat=True).first()
+            return JsonResponse({
+                'post': post_id,
+                'liked': self.liked,
+                'likes': likes,
+            })
+        return redirect(self.get_redirect_url(*args, **kwargs))
+
+    def get(self, request, *args, **kwargs):
+        return redirect('posts:post_detail', post_id=kwargs.get('post_id'))
+
+
 @method_decorator(login_required, name='dispatch')
-class LikeRedirectView(LastPageRedirectView):
+class LikeRedirectView(BaseLikeView):
     """Add like for post."""
-    def get(self, request, *args, **kwargs):
-        user = get_object_or_404(User, id=request.user.id)
-        post = get_object_or_404(Post, id=kwargs.get('post_id'))
-        if user not in post.user_likes.all():
-            post.likes += 1
-            post.user_likes.add(user)
-            post.save()
-        return redirect(self.get_redirect_url(*args, **kwargs))
+    liked = True
 
 
 @method_decorator(login_required, name='dispatch')
-class DislikeRedirectView(LastPageRedirectView):
+class DislikeRedirectView(BaseLikeView):
     """Remove like for post."""
-    def get(self, request, *args, **kwargs):
-        user = get_object_or_404(User, id=request.user.id)
-        post = get_object_or_404(Post, id=kwargs.get('post_id'))
-        if user in post.user_likes.all():
-            post.likes -= 1
-            post.user_likes.remove(user)
-            post.save()
-        return redirect(self.get_redirect_url(*args, **kwargs))
+    liked = False
@@ -55,6 +55,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'account.apps.AccountConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
     'debug_toolbar',
     'django_rename_app',
@@ -63,6 +64,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.queries.QueryBudgetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -96,7 +98,12 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
@@ -140,15 +147,48 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
-if DEBUG:
-    STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
-else:
-    STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+# Filled by collectstatic and served by core.files.serve_static.
+STATIC_ROOT = os.getenv(
+    'STATIC_ROOT', os.path.join(BASE_DIR, 'collected_static'))
+if not DEBUG:
+    # Hashed names and precompressed siblings of static files.
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
 
 
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Browser cache time of uploads, thumbnails are cached forever.
+MEDIA_MAX_AGE = 60 * 60 * 24
+
+# Uploads are streamed to disk, images are shrunk and re-encoded.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+IMAGE_MAX_SIZE = 2048
+IMAGE_QUALITY = 82
+IMAGE_KEEP_BYTES = 200 * 1024
+
+# Thumbnails made in background after upload, templates use only these.
+THUMBNAIL_GEOMETRIES = {
+    'posts.Post.image': (
+        ('960x450', {'crop': 'center'}),
+        ('960x339', {'crop': 'center'}),
+    ),
+    'account.Profile.photo': (
+        ('120x120', {'crop': 'center'}),
+        ('230', {}),
+    ),
+}
+
+# Background jobs, see core.jobs.
+JOB_WORKERS = 4
+JOB_BATCH_SIZE = 10
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 10
+JOB_VISIBILITY_TIMEOUT = 300
+JOB_POLL_INTERVAL = 1
 
 
 # login URLs
@@ -164,3 +204,24 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # Post setting
 POST_LIMIT_ON_PAGE = 10
 STR_VIEW_TEXT_LENGTH = 15
+
+
+# Account setting
+FOLLOWS_LIMIT_ON_PAGE = 50
+
+
+# Query budget setting
+# Queries of every view are summed up in cache, see query_stats command
+QUERY_STATS = DEBUG
+
+
+# Follow feed setting
+# Posts of authors with more followers are merged into feed at read time
+FEED_FANOUT_LIMIT = 1000
+
+
+# View counter setting
+# Views are buffered in cache and written to database in batches
+VIEW_COUNT_BUFFER = True
+VIEW_COUNT_FLUSH_THRESHOLD = 100
+VIEW_COUNT_FLUSH_INTERVAL = 60
@@ -1,9 +1,8 @@
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from django.views.static import serve
-from django.conf.urls import url
+
+from core.files import serve_media, serve_static
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 handler400 = 'core.views.bad_request'
@@ -17,24 +16,14 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('about/', include('about.urls')),
     path('account/', include('account.urls', namespace='account')),
+    path('api/', include('api.urls', namespace='api')),
 ]
 
 if settings.DEBUG:
     import debug_toolbar
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)
 
 urlpatterns += [
-    url(
-        r'^media/(?P<path>.*)$',
-        serve,
-        {'document_root': settings.MEDIA_ROOT}
-    ),
-    url(
-        r'^static/(?P<path>.*)$',
-        serve,
-        {'document_root': settings.STATIC_ROOT}
-    )
+    path('media/<path:path>', serve_media),
+    path('static/<path:path>', serve_static),
 ]